@@ -0,0 +1 @@
+"""Standalone benchmark scripts, run from the repository root with ``python -m benchmarks.<name>``"""
@@ -0,0 +1,72 @@
+"""Load test of the chat model calls against a local fake OpenAI endpoint
+
+    python -m benchmarks.bench_chat_load [--sessions 64] [--turns 5]
+
+Simulates concurrent sessions, each sending several chat turns, with:
+  fresh     a new OpenAI client per turn (the original page)
+  cached    the shared client from core.chat.get_client
+  pipeline  the async pipeline from core.chat_pipeline
+and reports throughput, latency percentiles and TCP connections opened.
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import openai
+
+from benchmarks.fake_openai import serve
+from core.chat import get_client, get_openai_response
+from core.chat_pipeline import ChatPipeline
+
+MESSAGES = [{"role": "user", "content": "¿A qué hora es la keynote?"}]
+
+
+def run(mode, server, sessions, turns, max_concurrency):
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    handler = server.RequestHandlerClass
+    handler.connections = handler.requests_served = 0
+    pipeline = ChatPipeline(max_concurrency, max_queue=sessions) if mode == "pipeline" else None
+
+    def turn():
+        start = time.perf_counter()
+        if mode == "fresh":
+            client = openai.OpenAI(api_key="fake", base_url=base_url)
+            get_openai_response(MESSAGES, "fake", "fake", 0.7, client=client)
+        elif mode == "cached":
+            client = get_client("fake", base_url)
+            get_openai_response(MESSAGES, "fake", "fake", 0.7, client=client)
+        else:
+            pipeline.complete(MESSAGES, "fake", "fake", 0.7, base_url=base_url)
+        return time.perf_counter() - start
+
+    def session(_):
+        return [turn() for _ in range(turns)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(sessions) as executor:
+        latencies = [t for ts in executor.map(session, range(sessions)) for t in ts]
+    elapsed = time.perf_counter() - start
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{mode:9} {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50 {quantiles[49] * 1000:7.1f} ms  p95 {quantiles[94] * 1000:7.1f} ms  "
+        f"connections {handler.connections:5d}  "
+        f"max in flight {'∞' if pipeline is None else max_concurrency}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--modes", nargs="+", default=["fresh", "cached", "pipeline"])
+    args = parser.parse_args()
+
+    server = serve(latency=args.latency)
+    for mode in args.modes:
+        run(mode, server, args.sessions, args.turns, args.max_concurrency)
@@ -0,0 +1,166 @@
+"""Import cost of every page, measured with ``python -X importtime``
+
+For each page, the top-level imports of the script are run in a fresh
+interpreter that has already imported Streamlit (the server always has), and
+the time of everything they pull in on top of it is reported. With --check
+the script exits with an error when a page imports a module it should defer.
+
+    python -m benchmarks.bench_imports [--repeat 3] [--check] [--server]
+
+--server also measures how long ``streamlit run`` takes to pass its health
+check, i.e. the container's time to healthy.
+"""
+
+import argparse
+import ast
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = [
+    "streamlit_app.py",
+    *sorted(
+        os.path.join("pages", name)
+        for name in os.listdir(os.path.join(ROOT, "pages"))
+        if name.endswith(".py")
+    ),
+]
+MARKER = "--- page imports ---"
+
+# Loaded only by the feature that needs them, never on a page's first paint
+ALWAYS_DEFERRED = ("openai", "cv2", "av", "streamlit_webrtc")
+DEFERRED = {
+    "streamlit_app.py": ("numpy", "pandas"),
+    "pages/forms_demo.py": ("numpy", "pandas"),
+    "pages/iva_calculator.py": ("numpy", "pandas"),
+    "pages/welcome.py": ("numpy", "pandas"),
+}
+# Pages whose first paint is the feature needing them
+EAGER = {
+    "pages/video_camera.py": ("cv2", "av", "streamlit_webrtc"),
+}
+
+
+def top_level_imports(script):
+    with open(os.path.join(ROOT, script), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(
+        ast.unparse(node)
+        for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom))
+    )
+
+
+def import_times(code):
+    """{module: (self us, cumulative us)} of what `code` imports after Streamlit"""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import streamlit, sys\nprint({MARKER!r}, file=sys.stderr)\n{code}",
+        ],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    lines = result.stderr.split(MARKER, 1)[1].splitlines()
+    modules = {}
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line[len("import time:") :].split("|")
+        if own.strip().isdigit():
+            # Top-level entries are the ones not indented below another
+            modules[name.rstrip()] = (int(own), int(cumulative))
+    return modules
+
+
+def top_level_ms(modules):
+    # Cumulative times nest, so sum only the entries without indentation
+    return sum(cumulative for name, (_, cumulative) in modules.items() if not name.startswith("  ")) / 1000
+
+
+def bench(repeat, check):
+    failures = []
+    print(f"{'script':32} {'imports ms':>11} {'modules':>8}  heaviest")
+    for script in SCRIPTS:
+        code = top_level_imports(script)
+        runs = [import_times(code) for _ in range(repeat)]
+        modules = runs[-1]
+        loaded = {name.strip() for name in modules}
+        heaviest = sorted(
+            (
+                (cumulative, name.strip())
+                for name, (_, cumulative) in modules.items()
+                if not name.startswith("  ")
+            ),
+            reverse=True,
+        )[:3]
+        print(
+            f"{script:32} {statistics.median(top_level_ms(run) for run in runs):11.1f} "
+            f"{len(modules):8}  "
+            + ", ".join(f"{name} {us / 1000:.0f} ms" for us, name in heaviest)
+        )
+        for name in ALWAYS_DEFERRED + DEFERRED.get(script, ()):
+            if name in loaded and name not in EAGER.get(script, ()):
+                failures.append(f"{script} imports {name}")
+
+    if failures:
+        print("\nModules that should be deferred:")
+        for failure in failures:
+            print(f"  {failure}")
+        if check:
+            sys.exit(1)
+
+
+def time_to_healthy():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        port = s.getsockname()[1]
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "streamlit",
+            "run",
+            "streamlit_app.py",
+            "--server.headless=true",
+            f"--server.port={port}",
+        ],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while server.poll() is None:
+            try:
+                with urllib.request.urlopen(
+                    f"http://localhost:{port}/_stcore/health", timeout=1
+                ):
+                    return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait()
+    raise RuntimeError("streamlit run exited before passing the health check")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--server", action="store_true")
+    args = parser.parse_args()
+    bench(args.repeat, args.check)
+    if args.server:
+        print(f"\nstreamlit run to healthy: {time_to_healthy():.2f} s")
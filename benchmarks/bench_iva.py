@@ -0,0 +1,131 @@
+"""Batch IVA calculation versus the per-value paths of the calculator
+
+Also checks, on random prices and every rate of the table, that the exact
+cents arithmetic of the batch matches the `Decimal` path, including prices
+with fractions of a cent and half-cent ties, and counts how often the old
+float formulas round to a different cent.
+
+    python -m benchmarks.bench_iva [--rows 1000000] [--check-rows 200000]
+"""
+
+import argparse
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from core.iva import ADD, EXTRACT, RATES, add_iva, compute_batch, extract_iva, resolve_rates
+
+
+def per_value(prices, rates, mode):
+    """The float formulas of the original single-price calculator"""
+    results = []
+    for price, iva_rate in zip(prices.tolist(), rates.tolist()):
+        if mode == ADD:
+            iva_amount = price * (iva_rate / 100)
+            results.append((price, iva_amount, price + iva_amount))
+        else:
+            price_without_iva = price / (1 + iva_rate / 100)
+            results.append((price_without_iva, price - price_without_iva, price))
+    return results
+
+
+def per_value_decimal(prices, rates, mode):
+    compute = add_iva if mode == ADD else extract_iva
+    return [compute(price, rate) for price, rate in zip(prices.tolist(), rates.tolist())]
+
+
+# Half-cent ties that binary floats store just below the tie
+TIES = np.array([1.005, 0.125, 10.345, 2.675, 1.015, -1.005, -0.125, 0.005])
+
+
+def random_prices(rng, rows):
+    # Whole cents, with plenty of half-cent ties once the rate is applied
+    return rng.integers(1, 1_000_000, rows) / 100
+
+
+def sub_cent_prices(rng, rows):
+    """Prices with fractions of a cent: a third of them half-cent ties
+
+    A few have more decimals than the batch reads exactly, refunds included
+    """
+    prices = rng.integers(1, 10_000_000, rows) / 1000
+    prices[::3] = (rng.integers(0, 100_000, len(prices[::3])) * 10 + 5) / 1000
+    prices[::50] = rng.uniform(0, 1000, len(prices[::50]))
+    prices[::7] *= -1
+    return np.concatenate([TIES, prices])
+
+
+def bench(rows):
+    rng = np.random.default_rng(0)
+    prices = random_prices(rng, rows)
+    rate_names = rng.choice(["general", "reducido", "superreducido", "7", "9,5"], rows)
+
+    start = time.perf_counter()
+    rates, _ = resolve_rates(rate_names)
+    resolve = time.perf_counter() - start
+    print(f"{rows} rows - resolving rate names: {resolve * 1000:.0f} ms")
+
+    for mode in (ADD, EXTRACT):
+        start = time.perf_counter()
+        per_value(prices, rates, mode)
+        scalar = time.perf_counter() - start
+
+        start = time.perf_counter()
+        per_value_decimal(prices[: rows // 10], rates[: rows // 10], mode)
+        decimal = (time.perf_counter() - start) * 10
+
+        start = time.perf_counter()
+        compute_batch(prices, rates, mode)
+        batch = time.perf_counter() - start
+
+        print(
+            f"  {mode:8} float {scalar * 1000:6.0f} ms   "
+            f"Decimal ~{decimal * 1000:6.0f} ms   "
+            f"exact batch {batch * 1000:5.0f} ms   x{scalar / batch:.0f} vs float"
+        )
+
+
+def check(rows):
+    rng = np.random.default_rng(1)
+    print(f"{rows} random prices per rate and mode:")
+    for rate in RATES:
+        for mode in (ADD, EXTRACT):
+            # Batch and single values agree on sub-cent prices too
+            prices = sub_cent_prices(rng, rows // 10)
+            batch = compute_batch(prices, rate.percent, mode)
+            exact = per_value_decimal(prices, np.full(len(prices), rate.percent), mode)
+            for column in ("base", "iva", "total"):
+                expected = np.array([float(getattr(result, column)) for result in exact])
+                assert (batch[column].to_numpy() == expected).all(), (rate.label, mode, column)
+
+            prices = random_prices(rng, rows)
+            batch = compute_batch(prices, rate.percent, mode)
+            exact = per_value_decimal(prices, np.full(rows, rate.percent), mode)
+            exact_iva = np.array([float(result.iva) for result in exact])
+            exact_base = np.array([float(result.base) for result in exact])
+
+            # Invariants of the exact engine
+            assert (batch["iva"].to_numpy() == exact_iva).all(), (rate.label, mode)
+            assert (batch["base"].to_numpy() == exact_base).all(), (rate.label, mode)
+            assert all(r.base + r.iva == r.total for r in exact)
+            if mode == EXTRACT:
+                # Adding the tax back to the extracted base is off by a cent at most
+                back = [add_iva(r.base, rate.percent).total - r.total for r in exact]
+                assert all(abs(diff) <= Decimal("0.01") for diff in back)
+
+            floats = per_value(prices, np.full(rows, rate.percent), mode)
+            float_iva = np.round([result[1] for result in floats], 2)
+            wrong = int((float_iva != exact_iva).sum())
+            if wrong:
+                print(f"  {rate.label:34} {mode:8} float formulas off by a cent: {wrong}")
+    print("  exact batch == Decimal for every rate, sub-cent prices included")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--check-rows", type=int, default=200_000)
+    args = parser.parse_args()
+    check(args.check_rows)
+    bench(args.rows)
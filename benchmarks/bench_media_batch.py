@@ -0,0 +1,66 @@
+"""Throughput of the upload batch mode of the webcam page, by process count
+
+Encodes a synthetic video, then runs `core.media_batch.process_video` on it
+with 1..N worker processes and reports frames/sec.
+
+    python -m benchmarks.bench_media_batch [--frames 300] [--width 1280 --height 720]
+"""
+
+import argparse
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import av
+import numpy as np
+
+from core.media_batch import _process_chunk, process_video
+
+CHAINS = [("Invert",), ("Blur",), ("Canny Edge",), ("Blur", "Canny Edge", "Invert")]
+
+
+def synthetic_video(path, frames, width, height, fps=30):
+    rng = np.random.default_rng(0)
+    texture = rng.integers(0, 256, (height, width * 2, 3), dtype=np.uint8)
+    with av.open(path, "w") as output:
+        stream = output.add_stream("libx264", rate=fps)
+        stream.width = width
+        stream.height = height
+        stream.pix_fmt = "yuv420p"
+        for i in range(frames):
+            offset = (i * 9) % width
+            image = np.ascontiguousarray(texture[:, offset : offset + width])
+            output.mux(stream.encode(av.VideoFrame.from_ndarray(image, format="bgr24")))
+        output.mux(stream.encode(None))
+
+
+def bench(frames, width, height, max_processes):
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "source.mp4")
+        synthetic_video(source, frames, width, height)
+        print(f"{frames} frames, {width}x{height}, {os.cpu_count()} CPUs, frames/sec")
+
+        counts = sorted({1, 2, 4, max_processes} & set(range(1, max_processes + 1)))
+        print(f"  {'chain':32}" + "".join(f" {f'{n} proc':>8}" for n in counts))
+        for names in CHAINS:
+            row = []
+            for processes in counts:
+                with ProcessPoolExecutor(processes, mp_context=get_context("spawn")) as pool:
+                    # Start the workers and import their modules before timing
+                    tiny = [np.zeros((8, 8, 3), np.uint8)]
+                    list(pool.map(_process_chunk, *zip(*[(names, 1.0, tiny)] * processes)))
+                    result = process_video(source, names, pool=pool)
+                os.remove(result.path)
+                row.append(result.fps)
+            print(f"  {' → '.join(names):32}" + "".join(f" {fps:8.1f}" for fps in row))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    bench(args.frames, args.width, args.height, args.processes)
@@ -0,0 +1,305 @@
+"""End-to-end benchmark of every page, run headless with Streamlit's AppTest
+
+    python -m benchmarks.bench_pages [--talks 50 500 5000] [--users 1000 100000 1000000]
+                                     [--pages schedule chat_interface] [--repeat 5]
+                                     [--save-baseline] [--tolerance 0.25]
+
+Each page runs in its own interpreter against local fixtures: the schedule
+is served by a local HTTP server, the users table is a pre-filled SQLite
+database and the chat talks to benchmarks.fake_openai. Pages reading a
+schedule or the users table run once per fixture size.
+
+For every page it reports the first script run of the process (cold
+caches), the fastest warm script run, the fastest run after a typical
+interaction (a search, a filter, a chat message), the peak Python heap of a
+warm run and the number of elements rendered. The results are compared with
+the stored baseline and the script exits with an error when a page is slower
+or heavier than the tolerance allows, or raises. Baselines are only
+comparable on the same machine: run with --save-baseline there first.
+"""
+
+import argparse
+import functools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "bench_pages_baseline.json")
+# Seconds a single script run may take, for the largest fixtures
+RUN_TIMEOUT = 300
+# Differences below these are noise, whatever the relative change
+MIN_DELTA = {"cold_ms": 100.0, "load_ms": 10.0, "interact_ms": 10.0, "peak_mib": 1.0, "elements": 0}
+METRICS = tuple(MIN_DELTA)
+
+
+# Interactions, each followed by the timed rerun
+def type_name(at):
+    at.text_input[0].input("Ana")
+
+
+def enter_price(at):
+    at.number_input[0].set_value(1234.56)
+
+
+def search_talks(at):
+    at.text_input[0].input("python")
+
+
+def expand_schedule(at):
+    at.toggle[0].set_value(False)
+
+
+def filter_users(at):
+    at.text_input[0].input("Py")
+
+
+def ask_chat(at):
+    at.chat_input[0].set_value("¿Qué charlas hay sobre datos?")
+
+
+def choose_files(at):
+    # The live camera needs a browser: the first run fails under AppTest
+    at.radio[0].set_value("📁 Files")
+
+
+class Scenario:
+    __slots__ = ("name", "script", "fixture", "interact", "env", "expect_errors")
+
+    def __init__(self, name, script, fixture=None, interact=None, env=None, expect_errors=False):
+        self.name = name
+        self.script = script
+        # "talks", "users" or None: run once per size of that fixture
+        self.fixture = fixture
+        self.interact = interact
+        self.env = env or {}
+        # The first script run raises, only the interaction must not
+        self.expect_errors = expect_errors
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("streamlit_app", "streamlit_app.py"),
+        Scenario("welcome", "pages/welcome.py"),
+        Scenario("basic_example", "pages/basic_example.py", interact=type_name),
+        Scenario("forms_demo", "pages/forms_demo.py", interact=type_name),
+        Scenario("iva_calculator", "pages/iva_calculator.py", interact=enter_price),
+        Scenario("schedule", "pages/schedule.py", "talks", search_talks),
+        Scenario("schedule_full", "pages/schedule.py", "talks", expand_schedule),
+        Scenario("chat_interface", "pages/chat_interface.py", "talks", ask_chat),
+        Scenario("user_profiles", "pages/user_profiles.py", "users", filter_users),
+        Scenario("video_camera", "pages/video_camera.py", interact=choose_files, expect_errors=True),
+        Scenario("profiler", "pages/profiler.py", env={"APP_PROFILING": "1"}),
+    )
+}
+
+
+def element_count(at):
+    return sum(1 for _ in at.main) + sum(1 for _ in at.sidebar)
+
+
+def errors(at):
+    return [exception.message for exception in at.exception]
+
+
+def run_page(scenario, repeat):
+    """Worker side: metrics of `scenario` over `repeat` fresh sessions"""
+    from streamlit.testing.v1 import AppTest
+
+    script = os.path.join(ROOT, scenario.script)
+    loads, interactions = [], []
+
+    # The first run of every AppTest scans the installed packages for
+    # components, which the server does once at startup: do it here, once
+    with tempfile.NamedTemporaryFile("w", suffix=".py") as empty:
+        components = AppTest.from_file(empty.name).run()._bidi_component_manager
+
+    def session():
+        at = AppTest.from_file(script, default_timeout=RUN_TIMEOUT)
+        at._bidi_component_manager = components
+        start = time.perf_counter()
+        at.run()
+        loads.append((time.perf_counter() - start) * 1000)
+        if scenario.interact is not None:
+            if not scenario.expect_errors and at.exception:
+                return at
+            scenario.interact(at)
+            start = time.perf_counter()
+            at.run()
+            interactions.append((time.perf_counter() - start) * 1000)
+        return at
+
+    for _ in range(repeat):
+        at = session()
+        if at.exception:
+            return {"error": errors(at)[0]}
+
+    # Separate run, so tracing doesn't slow down the timed ones
+    tracemalloc.start()
+    session()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    # Best of the warm runs, as timeit does: the others only add noise
+    return {
+        "cold_ms": loads[0],
+        "load_ms": min(loads[1:repeat] or loads[:1]),
+        "interact_ms": min(interactions) if interactions else None,
+        "peak_mib": peak / 2**20,
+        "elements": element_count(at),
+    }
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory):
+    """Local HTTP server for the schedule fixtures, in a daemon thread"""
+    handler = functools.partial(QuietHandler, directory=directory)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def prepare_fixtures(directory, talks, users):
+    from benchmarks.fixtures import make_schedule, make_users
+
+    for n_talks in talks:
+        with open(os.path.join(directory, f"schedule-{n_talks}.json"), "w", encoding="utf-8") as f:
+            json.dump(make_schedule(n_talks), f, ensure_ascii=False)
+    for n_users in users:
+        os.makedirs(os.path.join(directory, f"users-{n_users}"))
+        start = time.perf_counter()
+        make_users(os.path.join(directory, f"users-{n_users}", "users.db"), n_users)
+        print(f"  {n_users} users written in {time.perf_counter() - start:.1f} s")
+
+
+def run_worker(scenario, repeat, env):
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_pages", "--worker", scenario.name, "--repeat", str(repeat)],
+        cwd=ROOT,
+        env={**os.environ, **scenario.env, **env},
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        return {"error": result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench(names, talks, users, repeat):
+    from benchmarks.fake_openai import serve
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        print("Preparing fixtures")
+        prepare_fixtures(directory, talks, users)
+        schedules = serve_directory(directory)
+        openai = serve()
+        base_env = {
+            "OPENAI_BASE_URL": f"http://127.0.0.1:{openai.server_port}/v1",
+            "OPENAI_API_KEY": "fake",
+            "APP_WARMUP": "0",
+        }
+
+        print(
+            f"\n{'page':34} {'cold ms':>9} {'warm ms':>9} {'action ms':>10} "
+            f"{'peak MiB':>9} {'elements':>9}"
+        )
+        for name in names:
+            scenario = SCENARIOS[name]
+            sizes = {"talks": talks, "users": users}.get(scenario.fixture, [None])
+            for size in sizes:
+                key = name if size is None else f"{name}[{scenario.fixture}={size}]"
+                # A fresh data directory per run: no snapshot or cache from the last one
+                data_dir = tempfile.mkdtemp(dir=directory)
+                env = {**base_env, "APP_DATA_DIR": data_dir}
+                if scenario.fixture == "users":
+                    env["APP_DATA_DIR"] = os.path.join(directory, f"users-{size}")
+                schedule = f"schedule-{size if scenario.fixture == 'talks' else talks[0]}.json"
+                env["SCHEDULE_URL"] = f"http://127.0.0.1:{schedules.server_port}/{schedule}"
+
+                result = results[key] = run_worker(scenario, repeat, env)
+                if "error" in result:
+                    print(f"{key:34} ERROR {result['error']}")
+                    continue
+                interact = result["interact_ms"]
+                print(
+                    f"{key:34} {result['cold_ms']:9.1f} {result['load_ms']:9.1f} "
+                    f"{'-' if interact is None else f'{interact:.1f}':>10} "
+                    f"{result['peak_mib']:9.1f} {result['elements']:9d}"
+                )
+        schedules.shutdown()
+        openai.shutdown()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Regressions of `results` over `baseline`, as printable lines"""
+    regressions = []
+    for key, result in results.items():
+        if "error" in result:
+            regressions.append(f"{key}: {result['error']}")
+            continue
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in METRICS:
+            new, old = result.get(metric), previous.get(metric)
+            if new is None or old is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > MIN_DELTA[metric]:
+                regressions.append(f"{key}: {metric} {old:.1f} -> {new:.1f} (+{new / old - 1:.0%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--talks", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--users", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--worker", choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_page(SCENARIOS[args.worker], args.repeat)))
+        sys.exit()
+
+    results = bench(args.pages, args.talks, args.users, args.repeat)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            rounded = {
+                key: {metric: value if value is None else round(value, 2) for metric, value in result.items()}
+                for key, result in results.items()
+            }
+            json.dump(rounded, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {os.path.relpath(args.baseline, ROOT)}")
+        sys.exit()
+
+    try:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+        print("\nNo baseline yet: run with --save-baseline to store one")
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions")
@@ -0,0 +1,182 @@
+"""Session throughput of the app as replicas are added
+
+    python -m benchmarks.bench_replicas [--replicas 1 2 4] [--sessions 200]
+                                        [--concurrency 32] [--page schedule]
+    python -m benchmarks.bench_replicas --url http://localhost:8080 [--sessions 200]
+
+Each session opens the app's websocket, runs a page to the end and
+disconnects, like a visitor landing on it. Sessions run `--concurrency` at a
+time and the script reports sessions/sec and latency percentiles.
+
+Without --url the script starts the replicas itself: `streamlit run` on
+consecutive ports, sharing one data directory with a schedule snapshot, a
+users database and the chat response cache, as in the compose "scale"
+profile. Each session is pinned to one replica, as the sticky proxy does.
+With --url the sessions go through the proxy of a running deployment,
+keeping its route cookie like a browser.
+
+Throughput only grows with replicas up to the number of CPU cores. Needs
+the extra packages of benchmarks/requirements.txt.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from http.cookies import SimpleCookie
+
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+from benchmarks.bench_pages import serve_directory
+from benchmarks.fixtures import make_schedule, make_users
+from core.warmup import wait_until_healthy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_PORT = 8601
+ROUTE_COOKIE = "streamlit_route"
+
+
+def route_cookie(url):
+    """Cookie header the sticky proxy assigns to a new visitor, if any"""
+    with urllib.request.urlopen(url, timeout=10) as response:
+        cookie = SimpleCookie()
+        for header in response.headers.get_all("Set-Cookie") or ():
+            cookie.load(header)
+    if ROUTE_COOKIE not in cookie:
+        return None
+    return f"{ROUTE_COOKIE}={cookie[ROUTE_COOKIE].value}"
+
+
+async def session(url, page, sticky):
+    """Seconds to connect, run `page` to the end and disconnect"""
+    start = time.perf_counter()
+    headers = {}
+    if sticky:
+        cookie = await asyncio.to_thread(route_cookie, url)
+        if cookie is not None:
+            headers["Cookie"] = cookie
+    stream_url = url.replace("http", "ws", 1).rstrip("/") + "/_stcore/stream"
+    async with websockets.connect(
+        stream_url, subprotocols=["streamlit"], additional_headers=headers, max_size=None
+    ) as websocket:
+        message = BackMsg()
+        message.rerun_script.page_name = page
+        await websocket.send(message.SerializeToString())
+        async for raw in websocket:
+            message = ForwardMsg()
+            message.ParseFromString(raw)
+            if message.WhichOneof("type") == "script_finished":
+                if message.script_finished != ForwardMsg.FINISHED_SUCCESSFULLY:
+                    raise RuntimeError(f"{page!r} finished with status {message.script_finished}")
+                break
+    return time.perf_counter() - start
+
+
+async def load(urls, page, sessions, concurrency, sticky):
+    """(sessions/sec, latencies) of `sessions` sessions spread over `urls`"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(i):
+        async with semaphore:
+            return await session(urls[i % len(urls)], page, sticky)
+
+    # One untimed session per replica, to load its modules and caches
+    await asyncio.gather(*(session(url, page, sticky) for url in urls))
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(limited(i) for i in range(sessions)))
+    return sessions / (time.perf_counter() - start), latencies
+
+
+def report(label, throughput, latencies):
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{label:12} {throughput:8.1f} sessions/s  "
+        f"p50 {quantiles[49] * 1000:7.1f} ms  p95 {quantiles[94] * 1000:7.1f} ms"
+    )
+
+
+def start_replicas(count, env):
+    replicas = []
+    for i in range(count):
+        replicas.append(
+            subprocess.Popen(
+                [
+                    sys.executable,
+                    "-m",
+                    "streamlit",
+                    "run",
+                    "streamlit_app.py",
+                    "--server.headless=true",
+                    f"--server.port={BASE_PORT + i}",
+                    "--server.fileWatcherType=none",
+                    "--browser.gatherUsageStats=false",
+                ],
+                cwd=ROOT,
+                env={**os.environ, **env},
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        )
+    urls = [f"http://127.0.0.1:{BASE_PORT + i}" for i in range(count)]
+    for url in urls:
+        if not wait_until_healthy(f"{url}/_stcore/health"):
+            raise RuntimeError(f"{url} didn't pass its health check")
+    return replicas, urls
+
+
+def bench(replica_counts, page, sessions, concurrency, talks, users):
+    with tempfile.TemporaryDirectory() as directory:
+        fixtures = os.path.join(directory, "fixtures")
+        data_dir = os.path.join(directory, "data")
+        os.makedirs(fixtures)
+        os.makedirs(data_dir)
+        with open(os.path.join(fixtures, "schedule.json"), "w", encoding="utf-8") as f:
+            json.dump(make_schedule(talks), f, ensure_ascii=False)
+        make_users(os.path.join(data_dir, "users.db"), users)
+        schedules = serve_directory(fixtures)
+        env = {
+            "APP_DATA_DIR": data_dir,
+            "SCHEDULE_URL": f"http://127.0.0.1:{schedules.server_port}/schedule.json",
+            "CHAT_CACHE_DB": os.path.join(data_dir, "chat_cache.db"),
+        }
+
+        print(f"{page or 'welcome'}: {sessions} sessions, {concurrency} at a time, {os.cpu_count()} CPUs")
+        for count in replica_counts:
+            replicas, urls = start_replicas(count, env)
+            try:
+                throughput, latencies = asyncio.run(load(urls, page, sessions, concurrency, False))
+            finally:
+                for replica in replicas:
+                    replica.terminate()
+                for replica in replicas:
+                    replica.wait()
+            report(f"{count} replica{'s' if count > 1 else ''}", throughput, latencies)
+        schedules.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Proxy of a running deployment, instead of local replicas")
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--page", default="schedule", help="URL path of the page, '' for the welcome page")
+    parser.add_argument("--talks", type=int, default=500)
+    parser.add_argument("--users", type=int, default=10_000)
+    args = parser.parse_args()
+
+    if args.url:
+        report(
+            "proxy",
+            *asyncio.run(load([args.url], args.page, args.sessions, args.concurrency, True)),
+        )
+    else:
+        bench(args.replicas, args.page, args.sessions, args.concurrency, args.talks, args.users)
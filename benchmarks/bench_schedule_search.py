@@ -0,0 +1,43 @@
+"""Microbenchmark of the schedule full-text search
+
+    python -m benchmarks.bench_schedule_search [--talks 500 5000]
+"""
+
+import argparse
+import statistics
+import time
+
+from benchmarks.fixtures import make_schedule
+from core.talks import ScheduleIndex
+
+QUERIES = ["python", "streamlit datos", "fastap", "sala 3", "rendimiento desp", "zzz"]
+
+
+def bench(n_talks, repeat):
+    index = ScheduleIndex.from_schedule(make_schedule(n_talks))
+
+    start = time.perf_counter()
+    index.search("python")  # builds the inverted index
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"\n{n_talks} talks - inverted index built in {build_ms:.1f} ms")
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = index.search(query)
+            timings.append((time.perf_counter() - start) * 1e6)
+        print(
+            f"  {query!r:22} {len(results):6d} hits  "
+            f"median {statistics.median(timings):8.1f} µs  "
+            f"max {max(timings):8.1f} µs"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--talks", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    for n_talks in args.talks:
+        bench(n_talks, args.repeat)
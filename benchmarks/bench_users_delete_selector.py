@@ -0,0 +1,73 @@
+"""Cost of labelling the options of the delete selector
+
+    python -m benchmarks.bench_users_delete_selector [--users 10000 100000]
+
+The original selector offered every user and labelled each option with a
+boolean scan of the whole DataFrame (O(n²) per render). The current one
+offers the users of the page or of a prefix search with a LIMIT and labels
+them from an id -> name dict.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from core.users import AFICIONES, UserRepository
+
+# Options labelled to estimate the quadratic path, extrapolated to all users
+SAMPLE = 200
+
+
+def fill(repository, n_users):
+    rng = random.Random(0)
+    with repository.transaction() as conn:
+        conn.executemany(
+            "INSERT INTO users (nombre, edad, le_gusta_python, aficiones) VALUES (?, ?, ?, ?)",
+            (
+                (f"Usuario {i}", rng.randint(1, 99), rng.choice(["Sí", "No"]), rng.choice(AFICIONES))
+                for i in range(n_users)
+            ),
+        )
+
+
+def bench(n_users):
+    with tempfile.TemporaryDirectory() as tmp:
+        repository = UserRepository(os.path.join(tmp, "users.db"))
+        fill(repository, n_users)
+
+        # Original: load every user and scan the frame once per option
+        start = time.perf_counter()
+        with repository.connection() as conn:
+            users_df = pd.read_sql_query("SELECT * FROM users", conn)
+        load = time.perf_counter() - start
+        ids = users_df["id"].tolist()
+        start = time.perf_counter()
+        for x in ids[:SAMPLE]:
+            f"{users_df[users_df['id'] == x]['nombre'].iloc[0]} (ID: {x})"
+        per_option = (time.perf_counter() - start) / SAMPLE
+        original = load + per_option * len(ids)
+
+        # Current: prefix search with a LIMIT, labels from a dict
+        start = time.perf_counter()
+        options = repository.search_users("Usuario 1")
+        for x in options:
+            f"{options[x]} (ID: {x})"
+        current = time.perf_counter() - start
+        repository.close()
+
+    print(
+        f"{n_users:7d} users  original ~{original * 1000:10.1f} ms "
+        f"({len(ids)} options)  current {current * 1000:6.2f} ms ({len(options)} options)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+    for n_users in args.users:
+        bench(n_users)
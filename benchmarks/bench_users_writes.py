@@ -0,0 +1,68 @@
+"""Multi-threaded write benchmark of the users table
+
+    python -m benchmarks.bench_users_writes [--threads 16] [--writes 200]
+
+Compares the original connect-per-call access (rollback journal, default
+busy timeout) with the pooled WAL repository in core.users.
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.users import CREATE_USERS, INSERT_USER, UserRepository
+
+
+def connect_per_call(path):
+    conn = sqlite3.connect(path)
+    conn.execute(CREATE_USERS)
+    conn.commit()
+    conn.close()
+
+    def insert(i):
+        try:
+            conn = sqlite3.connect(path, timeout=1)
+            conn.execute(INSERT_USER, (f"Usuario {i}", 30, "Sí", "Programación"))
+            conn.commit()
+            conn.close()
+            return True
+        except sqlite3.Error:
+            return False
+
+    return insert
+
+
+def pooled(path):
+    repository = UserRepository(path)
+
+    def insert(i):
+        success, _ = repository.insert_user(f"Usuario {i}", 30, "Sí", "Programación")
+        return success
+
+    return insert
+
+
+def bench(name, make_insert, threads, writes):
+    with tempfile.TemporaryDirectory() as tmp:
+        insert = make_insert(os.path.join(tmp, "users.db"))
+        total = threads * writes
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            results = list(executor.map(insert, range(total)))
+        elapsed = time.perf_counter() - start
+    print(
+        f"{name:17} {total / elapsed:9.0f} writes/s  "
+        f"failed {results.count(False):5d}/{total}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+    bench("connect per call", connect_per_call, args.threads, args.writes)
+    bench("pooled WAL", pooled, args.threads, args.writes)
@@ -0,0 +1,109 @@
+"""Headless run of the webcam pipeline on synthetic frames
+
+Feeds `av.VideoFrame`s at a camera's pace to `core.video.FramePipeline`, as
+streamlit-webrtc would, and reports the achieved FPS, dropped frames and
+per-effect latency. The old synchronous ``recv`` (allocating new arrays for
+every conversion) is timed on the same frames for comparison.
+
+    python -m benchmarks.bench_video [--width 1280 --height 720] [--fps 30]
+"""
+
+import argparse
+import time
+from fractions import Fraction
+
+import av
+import cv2
+import numpy as np
+
+from core.video import EffectChain, FramePipeline
+
+EFFECTS = ("Normal", "Grayscale", "Canny Edge", "Black & White", "Blur", "Invert")
+
+
+def synthetic_frames(width, height, count, seed=0):
+    """Moving noise, so no two frames are equal"""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 256, (height, width * 2, 3), dtype=np.uint8)
+    for i in range(count):
+        offset = (i * 7) % width
+        frame = av.VideoFrame.from_ndarray(
+            np.ascontiguousarray(base[:, offset : offset + width]), format="bgr24"
+        )
+        # WebRTC's video clock
+        frame.pts = i * int(90_000 / 30)
+        frame.time_base = Fraction(1, 90_000)
+        yield frame
+
+
+def old_recv(frame, effect):
+    """The synchronous processor of the original page"""
+    img = frame.to_ndarray(format="bgr24")
+    if effect == "Grayscale":
+        processed = cv2.cvtColor(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2BGR)
+    elif effect == "Canny Edge":
+        processed = cv2.cvtColor(cv2.Canny(img, 100, 200), cv2.COLOR_GRAY2BGR)
+    elif effect == "Black & White":
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        _, bw = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
+        processed = cv2.cvtColor(bw, cv2.COLOR_GRAY2BGR)
+    elif effect == "Blur":
+        processed = cv2.GaussianBlur(img, (21, 21), 0)
+    elif effect == "Invert":
+        processed = cv2.bitwise_not(img)
+    else:
+        processed = img
+    return av.VideoFrame.from_ndarray(processed, format="bgr24")
+
+
+def run(effect, frames, fps, workers):
+    chain = EffectChain([] if effect == "Normal" else [effect])
+    pipeline = FramePipeline(chain, workers=workers)
+    interval = 1 / fps
+    next_at = time.perf_counter()
+    start = next_at
+    try:
+        for frame in frames:
+            # The camera doesn't wait for us
+            next_at += interval
+            pipeline.recv(frame)
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        pipeline.wait_idle()
+        return pipeline.stats(), time.perf_counter() - start
+    finally:
+        pipeline.close()
+
+
+def bench(width, height, fps, seconds, workers):
+    count = int(fps * seconds)
+    frames = list(synthetic_frames(width, height, count))
+    print(f"{width}x{height}, {count} frames at {fps} fps, {workers} workers")
+    print(
+        f"  {'effect':14} {'old recv ms':>11} {'latency ms':>10} {'p95':>6} "
+        f"{'out fps':>8} {'dropped':>8}"
+    )
+    for effect in EFFECTS:
+        start = time.perf_counter()
+        for frame in frames[:60]:
+            old_recv(frame, effect)
+        old_ms = (time.perf_counter() - start) / min(60, count) * 1000
+
+        stats, _ = run(effect, frames, fps, workers)
+        latency = stats["latency_ms"][effect]
+        print(
+            f"  {effect:14} {old_ms:11.2f} {latency['mean']:10.2f} {latency['p95']:6.2f} "
+            f"{stats['fps']:8.1f} {stats['dropped'] / stats['received']:8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    bench(args.width, args.height, args.fps, args.seconds, args.workers)
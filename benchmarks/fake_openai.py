@@ -0,0 +1,125 @@
+"""Local OpenAI-compatible chat completions server for offline runs
+
+    python -m benchmarks.fake_openai --port 8788 --token-delay 0.02
+    OPENAI_BASE_URL=http://127.0.0.1:8788/v1 OPENAI_API_KEY=fake streamlit run streamlit_app.py
+
+Answers every request with a canned reply, optionally streamed as SSE,
+after a configurable latency.
+"""
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = (
+    "¡Claro! La keynote de apertura es el viernes a las 09:30 en la sala "
+    "principal. Después hay charlas en paralelo en todas las salas."
+)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    token_delay = 0.0
+    requests_served = 0
+    connections = 0
+    _lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self._lock:
+            type(self).connections += 1
+
+    def _completion(self, body, **extra):
+        return {
+            "id": "chatcmpl-fake",
+            "object": extra.pop("object", "chat.completion"),
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            **extra,
+        }
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        with self._lock:
+            type(self).requests_served += 1
+        time.sleep(self.latency)
+
+        if not body.get("stream"):
+            payload = json.dumps(
+                self._completion(
+                    body,
+                    choices=[
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": REPLY},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    usage={"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                )
+            ).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for word in REPLY.split(" "):
+                chunk = self._completion(
+                    body,
+                    object="chat.completion.chunk",
+                    choices=[{"index": 0, "delta": {"content": word + " "}}],
+                )
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(self.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client cancelled the stream
+            pass
+        self.close_connection = True
+
+
+def serve(port=0, latency=0.0, token_delay=0.0):
+    """Start the server in a daemon thread and return it"""
+    handler = type(
+        "Handler",
+        (FakeOpenAIHandler,),
+        {
+            "latency": latency,
+            "token_delay": token_delay,
+            "requests_served": 0,
+            "connections": 0,
+        },
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8788)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.token_delay)
+    print(f"Fake OpenAI API on http://127.0.0.1:{server.server_port}/v1")
+    threading.Event().wait()
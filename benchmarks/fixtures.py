@@ -0,0 +1,91 @@
+"""Synthetic data of configurable size for the benchmarks"""
+
+import random
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from core.users import AFICIONES, INSERT_USER, migrate
+
+SYLLABLES = (
+    "py da ta web as ync ma chi ne lear ning ser vi dor ca che pan das num "
+    "ty pe test stre am lit rust go api fast dja ngo flask sql ite cu da"
+).split()
+COMMON_WORDS = (
+    "python streamlit datos pandas async web django fastapi testing llm numpy "
+    "typing packaging comunidad educación seguridad rendimiento despliegue"
+).split()
+
+
+def _word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_schedule(n_talks, days=3, n_rooms=8, seed=0):
+    """pretalx widget schedule (v0.3 layout) with `n_talks` talks"""
+    rng = random.Random(seed)
+    vocabulary = COMMON_WORDS + [_word(rng) for _ in range(max(200, n_talks))]
+    # Zipf-like word frequencies, as in real abstracts
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    rooms = [
+        {"id": i, "name": {"en": f"Room {i}", "es": f"Sala {i}"}}
+        for i in range(1, n_rooms + 1)
+    ]
+    tracks = [
+        {"id": i, "name": {"en": name}, "color": "#3572A5"}
+        for i, name in enumerate(["Data", "Web", "Core", "Community", "ML"], 1)
+    ]
+    speakers = [
+        {"code": f"SP{i:05d}", "name": f"{_word(rng).title()} {_word(rng).title()}"}
+        for i in range(max(1, n_talks * 2 // 3))
+    ]
+
+    base = datetime(2025, 10, 17, 7, 0, tzinfo=timezone.utc)
+    slots_per_day = max(1, -(-n_talks // (days * n_rooms)))
+    slot_minutes = max(5, 600 // slots_per_day)
+    talks = []
+    for i in range(n_talks):
+        day, rest = divmod(i, slots_per_day * n_rooms)
+        slot = rest // n_rooms
+        start = base + timedelta(days=day % days, minutes=slot * slot_minutes)
+        end = start + timedelta(minutes=slot_minutes)
+        talks.append(
+            {
+                "code": f"T{i:06d}",
+                "id": i,
+                "title": " ".join(rng.choices(vocabulary, weights, k=5)).capitalize(),
+                "abstract": " ".join(rng.choices(vocabulary, weights, k=80)),
+                "speakers": [rng.choice(speakers)["code"]],
+                "track": rng.choice(tracks)["id"],
+                "room": rooms[i % n_rooms]["id"],
+                "start": start.isoformat().replace("+00:00", "Z"),
+                "end": end.isoformat().replace("+00:00", "Z"),
+                "duration": slot_minutes,
+            }
+        )
+    # Breaks and registration have no code
+    talks.append({"title": "Registro", "start": base.isoformat(), "duration": 60})
+    return {"talks": talks, "rooms": rooms, "tracks": tracks, "speakers": speakers}
+
+
+def make_users(path, n_users, seed=0):
+    """SQLite users database at `path` with `n_users` rows"""
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    try:
+        migrate(conn)
+        conn.executemany(
+            INSERT_USER,
+            (
+                (
+                    f"{_word(rng).title()} {i}",
+                    rng.randint(1, 99),
+                    rng.choice(["Sí", "No"]),
+                    rng.choice(AFICIONES),
+                )
+                for i in range(n_users)
+            ),
+        )
+        conn.commit()
+    finally:
+        conn.close()
@@ -0,0 +1 @@
+"""Shared data and service layer used by the pages in ``pages/``"""
@@ -0,0 +1,170 @@
+"""Model calls for the chat page
+
+`openai` takes over half a second to import, so it is imported on the first
+model call instead of when the chat page is first rendered.
+"""
+
+import os
+import time
+
+import streamlit as st
+
+from core.profiler import EXTERNAL, profiler
+from core.retrieval import format_talks
+
+# Talks retrieved for each user message
+TOP_K_TALKS = 8
+# User turns searched for them: follow-ups ("¿y a qué hora es?") rarely
+# repeat the talk they refer to
+RETRIEVAL_TURNS = 3
+# Seconds before an unused client (and its connection pool) is dropped
+CLIENT_TTL = 60 * 60
+# Clients kept per process, one per API key and endpoint
+MAX_CLIENTS = 32
+
+SYSTEM_PROMPT = """Eres un asistente útil y amigable para PyConES 2025, la conferencia de Python en España.
+Puedes ayudar con preguntas sobre:
+- Python y programación
+- Streamlit y desarrollo web
+- PyConES 2025 y la comunidad Python
+- Tecnología en general
+
+Responde en español de manera clara y concisa.
+{schedule_context}"""
+
+
+@st.cache_resource(max_entries=MAX_CLIENTS, ttl=CLIENT_TTL, show_spinner=False)
+def get_client(api_key, base_url=None):
+    """OpenAI client shared by every session using the same key and endpoint
+
+    Reusing the client reuses its keep-alive connection pool, so a chat turn
+    doesn't pay for a new TCP/TLS handshake.
+    """
+    import openai
+
+    return openai.OpenAI(api_key=api_key, base_url=base_url, timeout=60, max_retries=2)
+
+
+def default_base_url():
+    return os.environ.get("OPENAI_BASE_URL") or None
+
+
+def build_system_message(query, index, k=TOP_K_TALKS):
+    """System message with only the talks relevant to `query`"""
+    if index is None:
+        context = "No se pudo cargar la información del horario."
+    else:
+        talks = index.retriever.top_k(query, k) if query else []
+        if talks:
+            context = (
+                f"El horario tiene {len(index)} charlas. Estas son las más relevantes "
+                "para la pregunta (fecha y hora de Madrid | duración | sala | track | "
+                f"título | ponentes | resumen):\n{format_talks(talks)}"
+            )
+        else:
+            # Nothing matched the words of the conversation, which doesn't
+            # mean no talk is relevant: don't tell the model otherwise
+            context = (
+                f"El horario tiene {len(index)} charlas, pero no se han incluido "
+                "sus detalles en este mensaje."
+            )
+    return {"role": "system", "content": SYSTEM_PROMPT.format(schedule_context=context)}
+
+
+def retrieval_query(messages, turns=RETRIEVAL_TURNS):
+    """The last `turns` user messages, to search the talks a turn may refer to"""
+    recent = [message["content"] for message in messages if message["role"] == "user"]
+    return "\n".join(recent[-turns:])
+
+
+def is_error_message(text):
+    """Whether `text` is one of the messages produced by `error_message`"""
+    return text.lstrip().startswith(("❌", "⏱️"))
+
+
+class StreamError(str):
+    """Error text yielded by a stream in place of (the rest of) the answer
+
+    It is shown like any other chunk, but tells the response cache that the
+    answer is incomplete and must not be cached.
+    """
+
+
+def error_message(error):
+    import openai
+
+    if isinstance(error, openai.AuthenticationError):
+        return "❌ Error de autenticación. Verifica tu API key de OpenAI."
+    if isinstance(error, openai.RateLimitError):
+        return "⏱️ Has alcanzado el límite de uso. Intenta de nuevo más tarde."
+    return f"❌ Error: {str(error)}"
+
+
+def build_request(messages, model, temperature, index):
+    """Keyword arguments of ``chat.completions.create`` for a chat turn"""
+    system_message = build_system_message(retrieval_query(messages), index)
+    return {
+        "model": model,
+        "messages": [system_message] + messages,
+        "temperature": temperature,
+        "max_tokens": 500,
+    }
+
+
+def get_openai_response(messages, api_key, model, temperature, index=None, client=None):
+    """Get response from OpenAI API
+
+    `client` can be any object with the OpenAI ``chat.completions.create``
+    interface, which lets the function run offline against a stub.
+    """
+    try:
+        if client is None:
+            client = get_client(api_key, default_base_url())
+
+        with profiler.timed("openai", kind=EXTERNAL):
+            response = client.chat.completions.create(
+                **build_request(messages, model, temperature, index)
+            )
+
+        return response.choices[0].message.content
+
+    except Exception as e:
+        return error_message(e)
+
+
+def stream_openai_response(
+    messages, api_key, model, temperature, index=None, client=None
+):
+    """Yield the response text from OpenAI API as it is generated
+
+    Errors are yielded as `StreamError` text, like in `get_openai_response`. Closing the
+    generator early (e.g. when the script run is stopped) closes the HTTP
+    stream, so the model stops generating tokens nobody will read.
+    """
+    start = time.perf_counter()
+    try:
+        if client is None:
+            client = get_client(api_key, default_base_url())
+
+        stream = client.chat.completions.create(
+            **build_request(messages, model, temperature, index), stream=True
+        )
+    except Exception as e:
+        profiler.record(EXTERNAL, "openai", time.perf_counter() - start, failed=True)
+        yield StreamError(error_message(e))
+        return
+
+    failed = False
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    except Exception as e:
+        failed = True
+        yield StreamError(f"\n\n{error_message(e)}")
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+        # Until the whole answer is read, or the stream is closed
+        profiler.record(EXTERNAL, "openai", time.perf_counter() - start, failed)
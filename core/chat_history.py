@@ -0,0 +1,122 @@
+"""Bounded chat history with a token budget and a rolling summary
+
+Only the most recent messages that fit in the token budget are sent to the
+model. Older messages are folded into a short extractive summary, so the
+cost of a request no longer grows with the length of the conversation. The
+history kept for display is capped too.
+"""
+
+from collections import deque
+
+# Tokens of conversation sent with each request, besides the summary
+HISTORY_TOKEN_BUDGET = 1500
+SUMMARY_TOKEN_BUDGET = 300
+# Messages kept for display; older ones only survive in the summary
+MAX_STORED_MESSAGES = 100
+SUMMARY_LINE_CHARS = 160
+# Per-message overhead of the chat format, in tokens
+MESSAGE_OVERHEAD = 4
+
+ROLE_NAMES = {"user": "Usuario", "assistant": "Asistente"}
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token), good enough for budgeting"""
+    return len(text) // 4 + MESSAGE_OVERHEAD
+
+
+class Message:
+    __slots__ = ("role", "content", "timestamp")
+
+    def __init__(self, role, content, timestamp=""):
+        self.role = role
+        self.content = content
+        self.timestamp = timestamp
+
+    def to_api(self):
+        return {"role": self.role, "content": self.content}
+
+
+class ChatHistory:
+    """Messages of a chat session plus the summary of the ones out of the window"""
+
+    def __init__(
+        self,
+        token_budget=HISTORY_TOKEN_BUDGET,
+        summary_budget=SUMMARY_TOKEN_BUDGET,
+        max_messages=MAX_STORED_MESSAGES,
+    ):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.max_messages = max_messages
+        self.messages = deque()
+        # Index in `messages` of the first message still sent verbatim
+        self._window_start = 0
+        self._summary = deque()
+        self._summary_tokens = 0
+        self.summarized = 0
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def append(self, role, content, timestamp=""):
+        """Add a message and return it, so it can be filled while streaming"""
+        message = Message(role, content, timestamp)
+        self.messages.append(message)
+        if len(self.messages) > self.max_messages:
+            self._fold_window(min_start=len(self.messages) - self.max_messages)
+            self.messages.popleft()
+            self._window_start -= 1
+        return message
+
+    def _summarize(self, message):
+        if message.role not in ROLE_NAMES:
+            return
+        text = " ".join(message.content.split())
+        if len(text) > SUMMARY_LINE_CHARS:
+            text = text[:SUMMARY_LINE_CHARS].rsplit(" ", 1)[0] + "…"
+        line = f"- {ROLE_NAMES[message.role]}: {text}"
+        self._summary.append(line)
+        self._summary_tokens += estimate_tokens(line)
+        self.summarized += 1
+        # The summary is rolling too: the oldest lines go first
+        while self._summary_tokens > self.summary_budget and len(self._summary) > 1:
+            self._summary_tokens -= estimate_tokens(self._summary.popleft())
+
+    def _fold_window(self, min_start=0):
+        """Move messages out of the window until it fits the budget"""
+        messages = self.messages
+        window_tokens = sum(
+            estimate_tokens(messages[i].content)
+            for i in range(self._window_start, len(messages))
+        )
+        # Always keep the latest message, whatever its size
+        while self._window_start < len(messages) - 1 and (
+            window_tokens > self.token_budget or self._window_start < min_start
+        ):
+            message = messages[self._window_start]
+            window_tokens -= estimate_tokens(message.content)
+            self._summarize(message)
+            self._window_start += 1
+
+    def api_messages(self):
+        """Messages to send: the summary of older turns plus the recent window"""
+        self._fold_window()
+        api_messages = []
+        if self._summary:
+            api_messages.append(
+                {
+                    "role": "system",
+                    "content": "Resumen de la conversación anterior:\n"
+                    + "\n".join(self._summary),
+                }
+            )
+        api_messages.extend(
+            self.messages[i].to_api()
+            for i in range(self._window_start, len(self.messages))
+            if self.messages[i].role in ROLE_NAMES
+        )
+        return api_messages
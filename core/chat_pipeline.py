@@ -0,0 +1,199 @@
+"""Async model calls with a per-process concurrency limit for the chat page
+
+Script runs submit their requests to a single event loop running in a
+background thread. At most ``max_concurrency`` requests are in flight per
+process, up to ``max_queue`` more wait for a slot, and anything beyond that
+is rejected right away instead of piling onto the API.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+import streamlit as st
+
+from core.chat import (
+    CLIENT_TTL,
+    MAX_CLIENTS,
+    StreamError,
+    build_request,
+    default_base_url,
+    error_message,
+)
+from core.profiler import EXTERNAL, profiler
+
+MAX_CONCURRENCY = int(os.environ.get("CHAT_MAX_CONCURRENCY", "8"))
+MAX_QUEUE = int(os.environ.get("CHAT_MAX_QUEUE", "64"))
+BUSY_MESSAGE = "⏱️ Hay demasiadas consultas en curso. Intenta de nuevo en unos segundos."
+
+_DONE = object()
+
+
+class PipelineBusy(Exception):
+    """Raised when the request queue is full"""
+
+
+class _PooledClient:
+    """An `AsyncOpenAI` client with the requests using it"""
+
+    __slots__ = ("client", "last_used", "in_use", "evicted")
+
+    def __init__(self, client):
+        self.client = client
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self.evicted = False
+
+
+class ChatPipeline:
+    """Background event loop running `AsyncOpenAI` requests behind a semaphore"""
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.pending = 0
+        self._pending_lock = threading.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # (api_key, base_url) -> _PooledClient, least recently used first.
+        # Only touched from the event loop thread
+        self._clients = OrderedDict()
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(
+            target=self.loop.run_forever, name="chat-pipeline", daemon=True
+        ).start()
+
+    @asynccontextmanager
+    async def _client(self, api_key, base_url):
+        """Client for a request, bounded per process like `core.chat.get_client`"""
+        key = (api_key, base_url or default_base_url())
+        pooled = self._clients.pop(key, None)
+        if pooled is None:
+            # Imported on first use, like in `core.chat`
+            import openai
+
+            pooled = _PooledClient(
+                openai.AsyncOpenAI(api_key=api_key, base_url=key[1], timeout=60, max_retries=2)
+            )
+        self._clients[key] = pooled
+        pooled.in_use += 1
+        pooled.last_used = time.monotonic()
+        await self._evict_clients()
+        try:
+            yield pooled.client
+        finally:
+            pooled.in_use -= 1
+            pooled.last_used = time.monotonic()
+            if pooled.evicted and not pooled.in_use:
+                await pooled.client.close()
+
+    async def _evict_clients(self):
+        """Drop the clients over MAX_CLIENTS or unused for CLIENT_TTL
+
+        Their connection pools are closed once their last request finishes.
+        """
+        now = time.monotonic()
+        while self._clients:
+            key, pooled = next(iter(self._clients.items()))
+            if len(self._clients) <= MAX_CLIENTS and now - pooled.last_used < CLIENT_TTL:
+                break
+            del self._clients[key]
+            pooled.evicted = True
+            if not pooled.in_use:
+                await pooled.client.close()
+
+    def _acquire(self):
+        with self._pending_lock:
+            if self.pending >= self.max_concurrency + self.max_queue:
+                raise PipelineBusy()
+            self.pending += 1
+
+    def _release(self):
+        with self._pending_lock:
+            self.pending -= 1
+
+    async def _complete(self, request, api_key, base_url):
+        async with self._semaphore, self._client(api_key, base_url) as client:
+            with profiler.timed("openai", kind=EXTERNAL):
+                response = await client.chat.completions.create(**request)
+            return response.choices[0].message.content
+
+    async def _stream(self, request, api_key, base_url, chunks, cancelled):
+        try:
+            async with self._semaphore:
+                if cancelled.is_set():
+                    return
+                async with self._client(api_key, base_url) as client:
+                    with profiler.timed("openai", kind=EXTERNAL):
+                        stream = await client.chat.completions.create(**request, stream=True)
+                        try:
+                            async for chunk in stream:
+                                if cancelled.is_set():
+                                    break
+                                if chunk.choices and chunk.choices[0].delta.content:
+                                    chunks.put(chunk.choices[0].delta.content)
+                        finally:
+                            await stream.close()
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(_DONE)
+
+    def complete(self, messages, api_key, model, temperature, index=None, base_url=None):
+        """Blocking equivalent of `core.chat.get_openai_response`"""
+        try:
+            self._acquire()
+        except PipelineBusy:
+            return BUSY_MESSAGE
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                self._complete(
+                    build_request(messages, model, temperature, index), api_key, base_url
+                ),
+                self.loop,
+            )
+            return future.result()
+        except Exception as e:
+            return error_message(e)
+        finally:
+            self._release()
+
+    def stream(self, messages, api_key, model, temperature, index=None, base_url=None):
+        """Generator equivalent of `core.chat.stream_openai_response`"""
+        try:
+            self._acquire()
+        except PipelineBusy:
+            yield StreamError(BUSY_MESSAGE)
+            return
+
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        try:
+            asyncio.run_coroutine_threadsafe(
+                self._stream(
+                    build_request(messages, model, temperature, index),
+                    api_key,
+                    base_url,
+                    chunks,
+                    cancelled,
+                ),
+                self.loop,
+            )
+            while (chunk := chunks.get()) is not _DONE:
+                if isinstance(chunk, Exception):
+                    yield StreamError(f"\n\n{error_message(chunk)}")
+                else:
+                    yield chunk
+        finally:
+            # Also reached when the script run stops consuming the generator
+            cancelled.set()
+            self._release()
+
+
+@st.cache_resource
+def get_pipeline():
+    """Process-wide chat pipeline shared by every session"""
+    return ChatPipeline()
@@ -0,0 +1,6 @@
+"""Runtime settings shared by the core modules, overridable through the environment"""
+
+import os
+
+# Directory with the persistent state of the app (SQLite database, snapshots)
+DATA_DIR = os.environ.get("APP_DATA_DIR", "data")
@@ -0,0 +1,232 @@
+"""Exact IVA/IGIC/IPSI calculations for single prices and whole columns
+
+Amounts are handled in cents and rates in basis points (hundredths of a
+percent), so every result is exact and rounded half up to the cent, like
+an invoice. Single values go through `Decimal`; columns go through the
+same arithmetic on int64 NumPy arrays. NumPy and pandas are only imported
+by the batch functions, so the single-price calculator doesn't load them.
+"""
+
+import math
+from decimal import ROUND_HALF_UP, Decimal
+
+ADD = "add"
+EXTRACT = "extract"
+
+# Rates in percent of each regime
+TAX_RATES = {
+    "IVA": {"general": 21, "reducido": 10, "superreducido": 4},
+    "IGIC": {
+        "general": 7,
+        "reducido": 3,
+        "cero": 0,
+        "incrementado": 9.5,
+        "especial incrementado": 15,
+    },
+    "IPSI": {"0,5%": 0.5, "1%": 1, "2%": 2, "4%": 4, "8%": 8, "10%": 10},
+}
+IVA_RATES = TAX_RATES["IVA"]
+
+BASIS_POINTS = 10_000
+CENT = Decimal("0.01")
+
+
+def to_basis_points(rate):
+    """21 -> 2100, 9.5 -> 950"""
+    return int((Decimal(str(rate)) * 100).to_integral_value(ROUND_HALF_UP))
+
+
+class Rate:
+    """A tax rate with its precomputed multiplier and divisor"""
+
+    __slots__ = ("regime", "name", "percent", "basis_points", "divisor")
+
+    def __init__(self, regime, name, percent):
+        self.regime = regime
+        self.name = name
+        self.percent = percent
+        self.basis_points = to_basis_points(percent)
+        # price with tax = price * divisor / BASIS_POINTS
+        self.divisor = BASIS_POINTS + self.basis_points
+
+    @property
+    def label(self):
+        if self.name.endswith("%"):
+            return f"{self.regime} {self.name}"
+        percent = f"{self.percent:g}".replace(".", ",")
+        return f"{self.regime} {self.name.capitalize()} ({percent}%)"
+
+
+RATES = [
+    Rate(regime, name, percent)
+    for regime, rates in TAX_RATES.items()
+    for name, percent in rates.items()
+]
+# Names accepted in a batch file: "general" or "iva general" for IVA,
+# "igic general" for the rest
+RATE_NAMES = {
+    **{f"{rate.regime} {rate.name}".lower(): rate for rate in RATES},
+    **{rate.name: rate for rate in RATES if rate.regime == "IVA"},
+}
+
+
+class IvaResult:
+    __slots__ = ("base", "iva", "total")
+
+    def __init__(self, base, iva, total):
+        self.base = base
+        self.iva = iva
+        self.total = total
+
+    def __repr__(self):
+        return f"IvaResult(base={self.base}, iva={self.iva}, total={self.total})"
+
+
+def _decimal(value):
+    return Decimal(str(value)) if not isinstance(value, Decimal) else value
+
+
+def add_iva(price, rate):
+    """Tax of a price without tax, rounded half up to the cent"""
+    base = _decimal(price).quantize(CENT, ROUND_HALF_UP)
+    iva = (base * _decimal(rate) / 100).quantize(CENT, ROUND_HALF_UP)
+    return IvaResult(base, iva, base + iva)
+
+
+def extract_iva(price, rate):
+    """Base and tax of a price that already includes the tax"""
+    total = _decimal(price).quantize(CENT, ROUND_HALF_UP)
+    base = (total * 100 / (100 + _decimal(rate))).quantize(CENT, ROUND_HALF_UP)
+    return IvaResult(base, total - base, total)
+
+
+def _resolve_rate(rate, default):
+    """`Rate` of a rate name or custom percentage; None if unrecognized"""
+    if rate is None or (isinstance(rate, float) and math.isnan(rate)):
+        return default
+    if isinstance(rate, str):
+        rate = " ".join(rate.lower().split())
+        if not rate:
+            return default
+        if rate in RATE_NAMES:
+            return RATE_NAMES[rate]
+        # Anything else must be a custom percentage, e.g. "7" or "9,5%"
+        rate = rate.rstrip("%").replace(",", ".")
+    try:
+        percent = float(rate)
+    except (TypeError, ValueError):
+        return None
+    return Rate("Personalizado", f"{percent:g}%".replace(".", ","), percent)
+
+
+def resolve_rates(rates, default=RATE_NAMES["general"]):
+    """Percentages and labels for a column of rate names or custom percentages
+
+    Empty cells get the `default` Rate; anything that is neither a known
+    name nor a number (e.g. a typo like "reducdo") gets a NaN percentage and
+    a None label, for the caller to report. Labels tell apart rates of the
+    same percentage in different regimes, like IVA 4% and IPSI 4%.
+    """
+    import numpy as np
+    import pandas as pd
+
+    # A file has a handful of distinct rates: resolve each one only once
+    codes, uniques = pd.factorize(pd.Series(rates), use_na_sentinel=False)
+    resolved = [_resolve_rate(rate, default) for rate in uniques]
+    percentages = np.array([math.nan if rate is None else rate.percent for rate in resolved])
+    labels = np.array([None if rate is None else rate.label for rate in resolved], dtype=object)
+    return percentages[codes], labels[codes]
+
+
+def _to_units(values, decimals):
+    """Non-negative floats in units of ``10**-decimals``, rounded half up, as int64
+
+    Rounds the decimal a float was written as, like ``Decimal(str(value))`` in
+    `add_iva`, not its binary value: 1.005 is 101 cents, not 100.
+    """
+    import numpy as np
+
+    # Up to 6 decimals and 15 significant digits, a float reads back exactly
+    # as an integer of millionths; anything longer goes through Decimal
+    millionths = np.rint(values * 1e6)
+    exact = (values < 1e9) & (millionths / 1e6 == values)
+    step = 10 ** (6 - decimals)
+    units = np.empty(values.shape, dtype=np.int64)
+    units[exact] = (millionths[exact].astype(np.int64) + step // 2) // step
+    quantum = Decimal(1).scaleb(-decimals)
+    units[~exact] = [
+        int(_decimal(value).quantize(quantum, ROUND_HALF_UP).scaleb(decimals))
+        for value in values[~exact].tolist()
+    ]
+    return units
+
+
+def _div_round_half_up(numerator, denominator):
+    """Integer division rounded half up, for non-negative int64 arrays"""
+    return (2 * numerator + denominator) // (2 * denominator)
+
+
+def compute_cents(cents, basis_points, mode=ADD):
+    """(base, iva, total) in cents for int64 arrays of cents and basis points"""
+    if mode == ADD:
+        base = cents
+        iva = _div_round_half_up(cents * basis_points, BASIS_POINTS)
+        total = base + iva
+    elif mode == EXTRACT:
+        total = cents
+        base = _div_round_half_up(cents * BASIS_POINTS, BASIS_POINTS + basis_points)
+        iva = total - base
+    else:
+        raise ValueError(f"Unknown IVA mode {mode!r}")
+    return base, iva, total
+
+
+def compute_batch(prices, rates, mode=ADD, labels=None):
+    """Base, IVA and total for every price, computed exactly column-wise
+
+    With ``mode=ADD`` the prices are without IVA; with ``mode=EXTRACT`` they
+    already include it. Negative prices (refunds) are handled symmetrically.
+    `labels` (from `resolve_rates`) adds a ``tipo`` column naming each rate.
+    """
+    import numpy as np
+    import pandas as pd
+
+    prices = np.asarray(prices, dtype=float)
+    rates = np.asarray(rates, dtype=float)
+    cents = _to_units(np.abs(prices), 2)
+    basis_points = np.broadcast_to(_to_units(rates, 2), prices.shape)
+    rates = np.broadcast_to(rates, prices.shape)
+
+    sign = np.where(prices < 0, -1, 1)
+    base, iva, total = compute_cents(cents, basis_points, mode)
+    columns = {} if labels is None else {"tipo": np.broadcast_to(labels, prices.shape)}
+    return pd.DataFrame(
+        {
+            **columns,
+            "tipo_iva": rates,
+            "base": sign * base / 100,
+            "iva": sign * iva / 100,
+            "total": sign * total / 100,
+        }
+    )
+
+
+def totals_by_rate(results):
+    """Number of prices and sums of base, IVA and total per rate, summed in cents
+
+    Grouped by the ``tipo`` label when there is one, so rates of the same
+    percentage in different regimes get their own rows.
+    """
+    import numpy as np
+
+    keys = ["tipo_iva", "tipo"] if "tipo" in results.columns else ["tipo_iva"]
+    cents = results[["base", "iva", "total"]].mul(100).round().astype(np.int64)
+    cents[keys] = results[keys]
+    totals = cents.groupby(keys, sort=True).agg(
+        lineas=("total", "size"),
+        base=("base", "sum"),
+        iva=("iva", "sum"),
+        total=("total", "sum"),
+    )
+    totals[["base", "iva", "total"]] /= 100
+    return totals.reset_index()[[*reversed(keys), "lineas", "base", "iva", "total"]]
@@ -0,0 +1,180 @@
+"""Apply an effect chain to uploaded videos and images across a process pool
+
+Videos are decoded frame by frame with `av`, sent to the pool in small
+chunks with a bounded number of chunks in flight, and encoded to a file on
+disk as the processed chunks come back in order. Only a few chunks of frames
+are in memory at any time, whatever the length of the video.
+
+Results are written to a shared temporary directory; files older than
+`RESULT_TTL` are deleted whenever a new result is written, so sessions that
+never come back for their download don't fill the disk.
+"""
+
+import os
+import tempfile
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import av
+import cv2
+import numpy as np
+import streamlit as st
+
+from core.video import Buffers, EffectChain
+
+# Frames sent to a worker at once, to amortize the inter-process copies
+CHUNK_FRAMES = 8
+IMAGE_FORMATS = {".png": ".png", ".jpg": ".jpg", ".jpeg": ".jpg", ".webp": ".webp"}
+RESULTS_DIR = os.path.join(tempfile.gettempdir(), "effects-results")
+# Seconds a result stays on disk for its download
+RESULT_TTL = 60 * 60
+
+# Per worker process: compiled chains and their buffers
+_chains = {}
+_buffers = Buffers()
+
+
+def _process_chunk(names, scale, frames):
+    """Worker side: apply the chain to a list of BGR arrays"""
+    key = (names, scale)
+    chain = _chains.get(key)
+    if chain is None:
+        chain = _chains[key] = EffectChain(names, scale)
+    # Copies: the buffers are reused for the next frame of the chunk
+    return [np.array(chain(frame, _buffers)) for frame in frames]
+
+
+@st.cache_resource(show_spinner=False)
+def get_process_pool():
+    """Process-wide pool, one worker per CPU; spawned, since the server runs threads
+
+    Requests share it and each one limits its own chunks in flight.
+    """
+    return ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=get_context("spawn"))
+
+
+class BatchResult:
+    __slots__ = ("path", "frames", "seconds")
+
+    def __init__(self, path, frames, seconds):
+        self.path = path
+        self.frames = frames
+        self.seconds = seconds
+
+    @property
+    def fps(self):
+        return self.frames / self.seconds if self.seconds else 0.0
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def process_frames(frames, names, scale, pool, in_flight=2 * os.cpu_count()):
+    """Processed BGR arrays of `frames`, in order, with bounded look-ahead"""
+    pending = deque()
+    for chunk in _chunks(frames, CHUNK_FRAMES):
+        pending.append(pool.submit(_process_chunk, tuple(names), scale, chunk))
+        if len(pending) >= in_flight:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def _clean_results(max_age=RESULT_TTL):
+    """Delete the results nobody downloaded within `max_age` seconds"""
+    expired = time.time() - max_age
+    for entry in os.scandir(RESULTS_DIR):
+        try:
+            if entry.stat().st_mtime < expired:
+                os.remove(entry.path)
+        except OSError:
+            # Deleted by another session meanwhile
+            pass
+
+
+def _output_path(suffix):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    _clean_results()
+    fd, path = tempfile.mkstemp(prefix="effects-", suffix=suffix, dir=RESULTS_DIR)
+    os.close(fd)
+    return path
+
+
+def process_video(file, names, scale=1.0, processes=None, pool=None, on_progress=None):
+    """Encode `file` with the effect chain applied into a temporary .mp4
+
+    At most `processes` workers of the pool (all by default) are kept busy.
+    `on_progress(done, total)` is called every chunk; `total` is 0 when the
+    container doesn't say how many frames it has.
+    """
+    pool = pool or get_process_pool()
+    in_flight = 2 * (processes or os.cpu_count())
+    path = _output_path(".mp4")
+    start = time.perf_counter()
+    count = 0
+    with av.open(file) as source, av.open(path, "w") as output:
+        video = source.streams.video[0]
+        video.thread_type = "AUTO"
+        total = video.frames
+        # yuv420p needs even dimensions
+        width = video.codec_context.width // 2 * 2
+        height = video.codec_context.height // 2 * 2
+        stream = output.add_stream("libx264", rate=video.average_rate or 30)
+        stream.width = width
+        stream.height = height
+        stream.pix_fmt = "yuv420p"
+        # The encoder runs in this process and is usually the bottleneck
+        stream.options = {"preset": "veryfast"}
+
+        frames = (
+            frame.to_ndarray(format="bgr24")[:height, :width]
+            for frame in source.decode(video)
+        )
+        for processed in process_frames(frames, names, scale, pool, in_flight):
+            frame = av.VideoFrame.from_ndarray(processed, format="bgr24")
+            output.mux(stream.encode(frame))
+            count += 1
+            if on_progress is not None and count % CHUNK_FRAMES == 0:
+                on_progress(count, total)
+        output.mux(stream.encode(None))
+    return BatchResult(path, count, time.perf_counter() - start)
+
+
+def process_images(files, names, scale=1.0, processes=None, pool=None, on_progress=None):
+    """Zip with every image of `files` (objects with `name` and `getvalue()`)"""
+    pool = pool or get_process_pool()
+    in_flight = 2 * (processes or os.cpu_count())
+    path = _output_path(".zip")
+    start = time.perf_counter()
+    file_names = []
+
+    def images():
+        for file in files:
+            image = cv2.imdecode(np.frombuffer(file.getvalue(), np.uint8), cv2.IMREAD_COLOR)
+            if image is not None:
+                file_names.append(file.name)
+                yield image
+
+    count = 0
+    with zipfile.ZipFile(path, "w") as archive:
+        for processed in process_frames(images(), names, scale, pool, in_flight):
+            stem, extension = os.path.splitext(file_names[count])
+            extension = IMAGE_FORMATS.get(extension.lower(), ".png")
+            ok, encoded = cv2.imencode(extension, processed)
+            if ok:
+                archive.writestr(f"{stem}{extension}", encoded.tobytes())
+            count += 1
+            if on_progress is not None:
+                on_progress(count, len(files))
+    return BatchResult(path, count, time.perf_counter() - start)
@@ -0,0 +1,211 @@
+"""Opt-in profiling of page runs, code blocks, caches and external calls
+
+Enabled with APP_PROFILING=1. Durations are kept per process in rolling
+windows of the last APP_PROFILING_WINDOW samples, and can be exported as
+Prometheus text or JSON lines. When disabled, every hook is a no-op.
+
+    from core.profiler import timed
+
+    with timed("schedule.search"):
+        ...
+
+    @timed("users.page")
+    def load_page(): ...
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import ContextDecorator
+
+ENABLED = os.environ.get("APP_PROFILING", "").lower() in ("1", "true", "yes")
+WINDOW = int(os.environ.get("APP_PROFILING_WINDOW", "1000"))
+
+# Kinds of timed sections
+PAGE = "page"
+BLOCK = "block"
+EXTERNAL = "external"
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Timer(ContextDecorator):
+    """Context manager and decorator recording the duration of its body"""
+
+    def __init__(self, profiler, kind, name):
+        self.profiler = profiler
+        self.kind = kind
+        self.name = name
+        self._start = None
+
+    def _recreate_cm(self):
+        # A fresh timer per decorated call, so concurrent calls don't mix
+        return _Timer(self.profiler, self.kind, self.name)
+
+    def __enter__(self):
+        if self.profiler.enabled:
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._start is not None:
+            # Streamlit's reruns and stops are BaseExceptions, not failures
+            failed = exc_type is not None and issubclass(exc_type, Exception)
+            self.profiler.record(
+                self.kind, self.name, time.perf_counter() - self._start, failed
+            )
+        return False
+
+
+def _quantiles(values):
+    """QUANTILES of `values`, interpolated linearly like NumPy's default"""
+    values = sorted(values)
+    last = len(values) - 1
+    result = []
+    for quantile in QUANTILES:
+        position = quantile * last
+        low = int(position)
+        high = min(low + 1, last)
+        result.append(values[low] + (values[high] - values[low]) * (position - low))
+    return result
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Profiler:
+    """Rolling in-memory store of durations and cache hit/miss counts"""
+
+    def __init__(self, enabled=ENABLED, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        # (kind, name) -> deque of (unix time, seconds)
+        self._samples = {}
+        self._errors = {}
+        # cache name -> [hits, misses]
+        self._caches = {}
+
+    def timed(self, name, kind=BLOCK):
+        return _Timer(self, kind, name)
+
+    def record(self, kind, name, seconds, failed=False):
+        if not self.enabled:
+            return
+        key = (kind, name)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append((time.time(), seconds))
+            if failed:
+                self._errors[key] = self._errors.get(key, 0) + 1
+
+    def cache(self, name, hit):
+        """Count a hit or a miss of the cache `name`"""
+        if not self.enabled:
+            return
+        with self._lock:
+            counts = self._caches.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._errors.clear()
+            self._caches.clear()
+
+    def _snapshot(self):
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+            errors = dict(self._errors)
+            caches = {name: tuple(counts) for name, counts in self._caches.items()}
+        return samples, errors, caches
+
+    def summary(self):
+        """Count, errors, mean and percentiles in ms per timed section"""
+        samples, errors, _ = self._snapshot()
+        rows = []
+        for (kind, name), values in sorted(samples.items()):
+            ms = [value * 1000 for _, value in values]
+            p50, p95, p99 = _quantiles(ms)
+            rows.append(
+                {
+                    "kind": kind,
+                    "name": name,
+                    "count": len(ms),
+                    "errors": errors.get((kind, name), 0),
+                    "mean_ms": sum(ms) / len(ms),
+                    "p50_ms": p50,
+                    "p95_ms": p95,
+                    "p99_ms": p99,
+                }
+            )
+        return rows
+
+    def cache_summary(self):
+        _, _, caches = self._snapshot()
+        return [
+            {"cache": name, "hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+            for name, (hits, misses) in sorted(caches.items())
+            if hits + misses
+        ]
+
+    def prometheus(self):
+        """Prometheus text exposition of the current windows"""
+        samples, errors, caches = self._snapshot()
+        lines = [
+            "# HELP app_duration_seconds Durations over the rolling window",
+            "# TYPE app_duration_seconds summary",
+        ]
+        for (kind, name), values in sorted(samples.items()):
+            labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+            seconds = [value for _, value in values]
+            for quantile, value in zip(QUANTILES, _quantiles(seconds)):
+                lines.append(
+                    f'app_duration_seconds{{{labels},quantile="{quantile}"}} {value:.6f}'
+                )
+            lines.append(f"app_duration_seconds_sum{{{labels}}} {sum(seconds):.6f}")
+            lines.append(f"app_duration_seconds_count{{{labels}}} {len(seconds)}")
+
+        lines += [
+            "# HELP app_errors_total Timed sections that raised",
+            "# TYPE app_errors_total counter",
+        ]
+        for (kind, name), count in sorted(errors.items()):
+            lines.append(
+                f'app_errors_total{{kind="{_label(kind)}",name="{_label(name)}"}} {count}'
+            )
+
+        lines += [
+            "# HELP app_cache_requests_total Cache lookups by result",
+            "# TYPE app_cache_requests_total counter",
+        ]
+        for name, (hits, misses) in sorted(caches.items()):
+            lines.append(f'app_cache_requests_total{{cache="{_label(name)}",result="hit"}} {hits}')
+            lines.append(
+                f'app_cache_requests_total{{cache="{_label(name)}",result="miss"}} {misses}'
+            )
+        return "\n".join(lines) + "\n"
+
+    def json_lines(self):
+        """One JSON object per sample and per cache counter"""
+        samples, _, caches = self._snapshot()
+        lines = [
+            json.dumps({"kind": kind, "name": name, "time": at, "seconds": seconds})
+            for (kind, name), values in sorted(samples.items())
+            for at, seconds in values
+        ]
+        lines.extend(
+            json.dumps({"kind": "cache", "name": name, "hits": hits, "misses": misses})
+            for name, (hits, misses) in sorted(caches.items())
+        )
+        return "\n".join(lines) + "\n"
+
+
+# Shared by the whole process, including background threads
+profiler = Profiler()
+timed = profiler.timed
@@ -0,0 +1,93 @@
+"""Duration and delta bytes of each script or fragment run, per interaction
+
+Wrap a page or a fragment body in `measure_run` and give the widgets that
+trigger it `on_change=trigger("variant")`: every run is then logged in the
+session with the variant that caused it, how long it took and how many bytes
+of deltas it sent to the browser.
+"""
+
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+LOG_KEY = "rerun_log"
+TRIGGER_KEY = "rerun_trigger"
+# Runs kept per session
+MAX_RUNS = 500
+
+
+def trigger(variant):
+    """Widget callback recording which variant caused the next run"""
+
+    def callback():
+        st.session_state[TRIGGER_KEY] = variant
+
+    return callback
+
+
+@contextmanager
+def measure_run(scope):
+    """Log the run of the enclosed block, attributed to the last trigger
+
+    ``scope`` is "script" for a full rerun or the name of a fragment.
+    """
+    ctx = get_script_run_ctx()
+    fragment_run = ctx is not None and bool(ctx.fragment_ids_this_run)
+    if scope != "script" and not fragment_run:
+        # Part of a full rerun, already measured as a whole
+        yield
+        return
+
+    variant = st.session_state.pop(TRIGGER_KEY, "other")
+    sent = [0, 0]
+    enqueue = ctx._enqueue if ctx is not None else None
+    if enqueue is not None:
+
+        def counting_enqueue(msg):
+            sent[0] += 1
+            sent[1] += msg.ByteSize()
+            enqueue(msg)
+
+        ctx._enqueue = counting_enqueue
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if enqueue is not None:
+            ctx._enqueue = enqueue
+        log = st.session_state.setdefault(LOG_KEY, [])
+        log.append(
+            {
+                "variant": variant,
+                "scope": scope,
+                "ms": elapsed * 1000,
+                "messages": sent[0],
+                "delta_bytes": sent[1],
+            }
+        )
+        del log[:-MAX_RUNS]
+
+
+def run_summary():
+    """Runs, mean/max execution time and mean delta bytes per variant"""
+    import pandas as pd
+
+    log = pd.DataFrame(st.session_state.get(LOG_KEY, []))
+    if log.empty:
+        return log
+    return (
+        log.groupby(["variant", "scope"])
+        .agg(
+            runs=("ms", "size"),
+            mean_ms=("ms", "mean"),
+            max_ms=("ms", "max"),
+            mean_messages=("messages", "mean"),
+            mean_delta_bytes=("delta_bytes", "mean"),
+            total_delta_bytes=("delta_bytes", "sum"),
+        )
+        .reset_index()
+    )
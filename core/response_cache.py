@@ -0,0 +1,218 @@
+"""Bounded cache of chat responses with deduplication of in-flight requests
+
+Attendees keep asking the same questions, so answers are cached by the
+normalized conversation, model, temperature and schedule checksum. Entries
+live in an in-memory LRU with a TTL and, optionally, in a SQLite file that
+several replicas can share. Identical requests that arrive while the first
+one is still running wait for its answer instead of calling the model again.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import streamlit as st
+
+from core.chat import StreamError, is_error_message
+from core.profiler import profiler
+from core.talks import tokenize
+
+RESPONSE_CACHE_TTL = 10 * 60
+RESPONSE_CACHE_MAX_ENTRIES = 1024
+# Optional SQLite file shared by replicas, e.g. data/chat_cache.db
+RESPONSE_CACHE_DB = os.environ.get("CHAT_CACHE_DB")
+
+
+class ResponseCache:
+    """LRU + TTL cache of responses, optionally backed by SQLite"""
+
+    def __init__(
+        self,
+        ttl=RESPONSE_CACHE_TTL,
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        db_path=None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.seconds_saved = 0.0
+        # key -> (expires_at, response, seconds it took to generate)
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    seconds REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(messages, model, temperature, schedule_checksum):
+        """Cache key of a chat turn, insensitive to case, accents and punctuation"""
+        conversation = [
+            (message["role"], " ".join(tokenize(message["content"])))
+            for message in messages
+        ]
+        payload = json.dumps([conversation, model, temperature, schedule_checksum])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _lookup(self, key):
+        """Cached (response, seconds) for `key`; call with the lock held"""
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1], entry[2]
+            del self._entries[key]
+
+        if self._db is not None:
+            row = self._db.execute(
+                "SELECT response, seconds, expires_at FROM responses"
+                " WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+            if row is not None:
+                self._remember(key, row[0], row[1], row[2])
+                return row[0], row[1]
+        return None
+
+    def _remember(self, key, response, seconds, expires_at):
+        self._entries[key] = (expires_at, response, seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _store(self, key, response, seconds):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, response, seconds, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                    (key, response, seconds, expires_at),
+                )
+                self._db.execute(
+                    "DELETE FROM responses WHERE expires_at <= ?", (time.time(),)
+                )
+                self._db.commit()
+
+    def _claim(self, key):
+        """Return ("hit", response), ("wait", future) or ("compute", future)"""
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                profiler.cache("chat_responses", hit=True)
+                self.hits += 1
+                self.seconds_saved += cached[1]
+                return "hit", cached[0]
+            if key in self._inflight:
+                self.coalesced += 1
+                return "wait", self._inflight[key]
+            profiler.cache("chat_responses", hit=False)
+            self.misses += 1
+            future = self._inflight[key] = Future()
+            return "compute", future
+
+    def _finish(self, key, future, response, seconds):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if response is not None and is_error_message(response):
+            # Errors can be specific to the caller (e.g. a wrong API key):
+            # requests that joined this one ask on their own
+            response = None
+        if response is not None:
+            self._store(key, response, seconds)
+        future.set_result(response)
+
+    def _await(self, future):
+        # Joining a request saves a model call, but not its latency
+        response = future.result()
+        if response is not None:
+            profiler.cache("chat_responses", hit=True)
+            with self._lock:
+                self.hits += 1
+        return response
+
+    def get_or_compute(self, key, compute):
+        """Cached response for `key`, computing it with `compute()` on a miss"""
+        state, value = self._claim(key)
+        if state == "hit":
+            return value
+        if state == "wait":
+            response = self._await(value)
+            # The request we joined failed: ask on our own
+            return response if response is not None else compute()
+
+        start = time.perf_counter()
+        response = None
+        try:
+            response = compute()
+            return response
+        finally:
+            self._finish(key, value, response, time.perf_counter() - start)
+
+    def stream(self, key, produce):
+        """Like `get_or_compute` for a generator of text chunks
+
+        A hit yields the whole cached response at once. A cancelled stream,
+        or one that yields a `StreamError`, is not cached, and requests
+        waiting on it generate their own answer.
+        """
+        state, value = self._claim(key)
+        if state == "hit":
+            yield value
+            return
+        if state == "wait":
+            response = self._await(value)
+            if response is not None:
+                yield response
+            else:
+                yield from produce()
+            return
+
+        start = time.perf_counter()
+        chunks = []
+        completed = failed = False
+        try:
+            for chunk in produce():
+                failed = failed or isinstance(chunk, StreamError)
+                chunks.append(chunk)
+                yield chunk
+            completed = not failed
+        finally:
+            self._finish(
+                key,
+                value,
+                "".join(chunks) if completed else None,
+                time.perf_counter() - start,
+            )
+
+
+@st.cache_resource
+def get_response_cache():
+    """Process-wide response cache shared by every session"""
+    return ResponseCache(db_path=RESPONSE_CACHE_DB)
@@ -0,0 +1,83 @@
+"""BM25 retrieval over the schedule, used to give the chat only the relevant talks"""
+
+import numpy as np
+
+from core.talks import tokenize
+
+# Standard BM25 parameters
+K1 = 1.5
+B = 0.75
+
+
+class TalkRetriever:
+    """BM25 index over talk titles, abstracts, speakers, rooms and tracks
+
+    Every (term, talk) weight is query independent, so it is computed once:
+    a query only sums the precomputed weights of its terms with NumPy.
+    """
+
+    def __init__(self, talks):
+        self.talks = tuple(talks)
+        term_freqs = []
+        lengths = np.zeros(len(self.talks), dtype=np.float32)
+        for position, talk in enumerate(self.talks):
+            tokens = tokenize(talk.search_text())
+            # Titles weigh twice as much as the rest of the text
+            tokens += tokenize(talk.title)
+            lengths[position] = len(tokens)
+            freqs = {}
+            for token in tokens:
+                freqs[token] = freqs.get(token, 0) + 1
+            term_freqs.append(freqs)
+
+        postings = {}
+        for position, freqs in enumerate(term_freqs):
+            for token, freq in freqs.items():
+                postings.setdefault(token, ([], []))
+                postings[token][0].append(position)
+                postings[token][1].append(freq)
+
+        n_docs = max(len(self.talks), 1)
+        norm = K1 * (1 - B + B * lengths / max(float(lengths.mean()), 1.0))
+        self._weights = {}
+        for token, (positions, freqs) in postings.items():
+            positions = np.asarray(positions, dtype=np.int32)
+            freqs = np.asarray(freqs, dtype=np.float32)
+            idf = np.log(1 + (n_docs - len(positions) + 0.5) / (len(positions) + 0.5))
+            weights = idf * freqs * (K1 + 1) / (freqs + norm[positions])
+            self._weights[token] = (positions, weights.astype(np.float32))
+
+    def top_k(self, query, k=8):
+        """The `k` talks with the best BM25 score for `query`, best first"""
+        scores = np.zeros(len(self.talks), dtype=np.float32)
+        for token in set(tokenize(query)):
+            if token in self._weights:
+                positions, weights = self._weights[token]
+                scores[positions] += weights
+
+        k = min(k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [self.talks[position] for position in best]
+
+
+def format_talks(talks, abstract_chars=240):
+    """Compact one-line-per-talk serialization for the model context"""
+    lines = []
+    for talk in talks:
+        abstract = " ".join(talk.abstract.split())
+        if len(abstract) > abstract_chars:
+            abstract = abstract[:abstract_chars].rsplit(" ", 1)[0] + "…"
+        fields = [
+            talk.start.strftime("%a %d/%m %H:%M"),
+            f"{talk.duration} min" if talk.duration else "",
+            str(talk.room or ""),
+            str(talk.track or ""),
+            talk.title,
+            ", ".join(talk.speakers),
+            abstract,
+        ]
+        lines.append(" | ".join(fields))
+    return "\n".join(lines)
@@ -0,0 +1,320 @@
+"""Shared PyConES schedule store used by the schedule and chat pages"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from types import MappingProxyType
+
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.config import DATA_DIR
+from core.profiler import EXTERNAL, profiler
+from core.talks import ScheduleIndex
+
+try:
+    import fcntl
+except ImportError:
+    # Windows and the browser build: a single process, nothing to coordinate
+    fcntl = None
+
+SCHEDULE_URL = os.environ.get(
+    "SCHEDULE_URL",
+    "https://pretalx.com/pycones-2025/schedule/v/0.3/widgets/schedule.json",
+)
+SNAPSHOT_PATH = os.path.join(DATA_DIR, "schedule.json")
+# Seconds before the cached copy is revalidated against pretalx
+SCHEDULE_TTL = 15 * 60
+# (connect, read) timeouts for pretalx, in seconds
+REQUEST_TIMEOUT = (3.05, 10)
+# Seconds after a failed download during which no script run waits for
+# another attempt; only the periodic refresher retries
+ERROR_COOLDOWN = 60
+
+
+def _freeze(value):
+    """Recursively turn parsed JSON into read-only mappings and tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _make_session():
+    """Connection-pooled session that retries transient pretalx failures"""
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(max_retries=retry))
+    session.mount("http://", HTTPAdapter(max_retries=retry))
+    return session
+
+
+class ScheduleStore:
+    """Single parsed copy of the schedule per process, revalidated after a TTL
+
+    The data is shared by every session and served without copying, so it is
+    frozen on load: callers get read-only mappings and tuples. Every
+    successful download is also persisted to an on-disk snapshot, so a cold
+    process serves the last known schedule immediately and revalidates it in
+    the background (stale-while-revalidate).
+
+    Replicas sharing the data directory also share the snapshot: refreshes
+    are serialized with a file lock, and a replica that finds a snapshot
+    fresher than its own copy serves it instead of asking pretalx again.
+    """
+
+    def __init__(self, url=SCHEDULE_URL, ttl=SCHEDULE_TTL, snapshot_path=SNAPSHOT_PATH):
+        self.url = url
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path
+        self.session = _make_session()
+        self.data = None
+        self.version = 0
+        # Content hash of the schedule, stable across processes and restarts
+        self.checksum = None
+        self.error = None
+        self._failed_at = None
+        self._etag = None
+        self._last_modified = None
+        self._fetched_at = 0.0
+        # Wall-clock time of the download the data comes from, in any process
+        self._downloaded_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher = None
+        self._index = None
+
+    @property
+    def is_stale(self):
+        return time.monotonic() - self._fetched_at > self.ttl
+
+    @property
+    def in_cooldown(self):
+        """Whether the last download failed less than `ERROR_COOLDOWN` ago"""
+        return (
+            self._failed_at is not None
+            and time.monotonic() - self._failed_at < ERROR_COOLDOWN
+        )
+
+    def _read_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with open(self.snapshot_path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return snapshot if isinstance(snapshot, dict) and "schedule" in snapshot else None
+
+    def _use_snapshot(self, snapshot):
+        """Serve `snapshot`; call with the lock held"""
+        # The same schedule refreshed by another replica keeps its version,
+        # so the talk index isn't rebuilt
+        if self.data is None or snapshot.get("checksum") != self.checksum:
+            self.data = _freeze(snapshot["schedule"])
+            self.version += 1
+            self.checksum = snapshot.get("checksum")
+        self._etag = snapshot.get("etag")
+        self._last_modified = snapshot.get("last_modified")
+        self._downloaded_at = snapshot.get("fetched_at", 0)
+        # Age the snapshot so it is revalidated once it outlives the TTL
+        age = max(0.0, time.time() - self._downloaded_at)
+        self._fetched_at = time.monotonic() - age
+
+    def load_snapshot(self):
+        """Serve the on-disk snapshot, if any, until the next refresh"""
+        snapshot = self._read_snapshot()
+        if snapshot is None:
+            return False
+        with self._lock:
+            if self.data is not None:
+                return False
+            self._use_snapshot(snapshot)
+        return True
+
+    def _load_newer_snapshot(self):
+        """Serve the snapshot if another process downloaded it after us"""
+        snapshot = self._read_snapshot()
+        if snapshot is None or snapshot.get("fetched_at", 0) <= self._downloaded_at:
+            return False
+        self._use_snapshot(snapshot)
+        return True
+
+    @contextmanager
+    def _refresh_lock(self):
+        """Serialize refreshes across the processes sharing the snapshot"""
+        lock_file = None
+        if fcntl is not None and self.snapshot_path:
+            try:
+                os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+                lock_file = open(f"{self.snapshot_path}.lock", "a")
+            except OSError:
+                # Read-only data directory: nobody else can write a snapshot
+                pass
+        if lock_file is None:
+            yield
+            return
+        with lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save_snapshot(self, data):
+        self._downloaded_at = time.time()
+        if not self.snapshot_path:
+            return
+        self._write_snapshot(
+            {
+                "checksum": self.checksum,
+                "etag": self._etag,
+                "last_modified": self._last_modified,
+                "fetched_at": self._downloaded_at,
+                "schedule": data,
+            }
+        )
+
+    def _touch_snapshot(self):
+        """Tell the other processes the snapshot was just revalidated"""
+        self._downloaded_at = time.time()
+        snapshot = self._read_snapshot()
+        if snapshot is not None and snapshot.get("checksum") == self.checksum:
+            snapshot["fetched_at"] = self._downloaded_at
+            self._write_snapshot(snapshot)
+
+    def _write_snapshot(self, snapshot):
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError:
+            # A read-only data directory only costs us the cold-start snapshot
+            pass
+
+    def get(self):
+        """Return the current schedule, fetching it on a cold cache"""
+        profiler.cache("schedule", hit=self.data is not None)
+        if self.data is None:
+            self.refresh()
+        elif self.is_stale:
+            self.refresh_in_background()
+        return self.data
+
+    def get_index(self):
+        """Return the talk index, rebuilt only when the schedule version changes"""
+        data = self.get()
+        if data is None:
+            return None
+        version = self.version
+        index = self._index
+        if index is None or index.version != version:
+            index = ScheduleIndex.from_schedule(data, version)
+            self._index = index
+        return index
+
+    def refresh(self, force=False):
+        """Revalidate the schedule with ETag / If-Modified-Since"""
+        with self._lock:
+            if not force and self.data is not None and not self.is_stale:
+                # Another thread refreshed it while we were waiting
+                return
+            if not force and self.in_cooldown:
+                # pretalx just failed (maybe while we were waiting): don't
+                # make this script run wait for another timeout
+                return
+
+            with self._refresh_lock():
+                if self._load_newer_snapshot() and not self.is_stale:
+                    # Another replica refreshed it while we were waiting
+                    self.error = None
+                    return
+                self._download()
+
+    def _download(self):
+        """Conditional GET of the schedule; call with both locks held"""
+        headers = {}
+        if self.data is not None:
+            if self._etag:
+                headers["If-None-Match"] = self._etag
+            if self._last_modified:
+                headers["If-Modified-Since"] = self._last_modified
+
+        try:
+            with profiler.timed("pretalx", kind=EXTERNAL):
+                response = self.session.get(
+                    self.url, headers=headers, timeout=REQUEST_TIMEOUT
+                )
+            if response.status_code == 304:
+                self._touch_snapshot()
+            else:
+                response.raise_for_status()
+                data = response.json()
+                self.data = _freeze(data)
+                self.version += 1
+                self.checksum = hashlib.sha1(response.content).hexdigest()
+                self._etag = response.headers.get("ETag")
+                self._last_modified = response.headers.get("Last-Modified")
+                self._save_snapshot(data)
+            self._fetched_at = time.monotonic()
+            self._failed_at = None
+            self.error = None
+        except (requests.RequestException, ValueError) as e:
+            # Keep serving the previous copy, if any
+            self.error = e
+            self._failed_at = time.monotonic()
+
+    def refresh_in_background(self):
+        """Revalidate without blocking the calling script run"""
+        if self._lock.locked():
+            return
+        threading.Thread(target=self.refresh, daemon=True).start()
+
+    def start_refresher(self):
+        """Keep the schedule current with a periodic background refresh"""
+        if self._refresher is not None:
+            return
+
+        def run():
+            while not self._stop.wait(self.ttl):
+                self.refresh(force=True)
+
+        self._refresher = threading.Thread(
+            target=run, name="schedule-refresher", daemon=True
+        )
+        self._refresher.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+@st.cache_resource
+def get_schedule_store():
+    """Process-wide schedule store shared by every session"""
+    store = ScheduleStore()
+    if store.load_snapshot() and store.is_stale:
+        store.refresh_in_background()
+    store.start_refresher()
+    return store
+
+
+def fetch_schedule_index():
+    """Indexed talks for the current schedule, or None if it is unavailable"""
+    store = get_schedule_store()
+    index = store.get_index()
+    if index is None and store.error is not None:
+        st.error(f"Error al cargar el horario: {store.error}")
+    return index
@@ -0,0 +1,200 @@
+"""Typed, indexed view of the pretalx schedule, built once per schedule version"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+from datetime import datetime
+
+import pytz
+
+MADRID_TZ = pytz.timezone("Europe/Madrid")
+_WORD_RE = re.compile(r"\w+")
+
+
+def _localized(name):
+    """pretalx names are either plain strings or {"lang": text} mappings"""
+    if hasattr(name, "get"):
+        return name.get("es") or name.get("en") or next(iter(name.values()), "")
+    return name
+
+
+def tokenize(text):
+    """Lowercase, accent-free word tokens ("Programación" -> "programacion")"""
+    text = text.lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WORD_RE.findall(text)
+
+
+def _names_by_key(items, key):
+    return {item[key]: _localized(item.get("name", item[key])) for item in items or ()}
+
+
+class Talk:
+    """A scheduled session with its start time already parsed and localized"""
+
+    __slots__ = (
+        "code",
+        "title",
+        "abstract",
+        "speakers",
+        "room",
+        "track",
+        "start",
+        "duration",
+        "day",
+    )
+
+    def __init__(self, code, title, abstract, speakers, room, track, start, duration):
+        self.code = code
+        self.title = title
+        self.abstract = abstract
+        self.speakers = speakers
+        self.room = room
+        self.track = track
+        self.start = start
+        self.duration = duration
+        self.day = start.strftime("%Y-%m-%d")
+
+    @classmethod
+    def from_json(cls, talk, rooms, tracks, speakers):
+        start = datetime.fromisoformat(talk["start"].replace("Z", "+00:00"))
+        room = talk.get("room")
+        track = talk.get("track")
+        return cls(
+            code=talk["code"],
+            title=talk.get("title") or "Sin título",
+            abstract=talk.get("abstract") or "",
+            speakers=tuple(speakers.get(s, s) for s in talk.get("speakers") or ()),
+            room=rooms.get(room, room),
+            track=tracks.get(track, track),
+            start=start.astimezone(MADRID_TZ),
+            duration=talk.get("duration"),
+        )
+
+    def __repr__(self):
+        return f"Talk({self.code!r}, {self.title!r})"
+
+    def search_text(self):
+        """Text covered by the full-text search"""
+        return " ".join(
+            (
+                self.title,
+                self.abstract,
+                " ".join(self.speakers),
+                str(self.room or ""),
+                str(self.track or ""),
+            )
+        )
+
+
+class ScheduleIndex:
+    """Talks sorted by start time plus lookup tables by day, room, track and speaker"""
+
+    def __init__(self, talks, version=0):
+        self.version = version
+        self.talks = tuple(sorted(talks, key=lambda talk: talk.start))
+        self.starts = [talk.start.timestamp() for talk in self.talks]
+        self.by_code = {talk.code: talk for talk in self.talks}
+        self.by_day = self._group(lambda talk: (talk.day,))
+        self.by_room = self._group(lambda talk: (talk.room,) if talk.room else ())
+        self.by_track = self._group(lambda talk: (talk.track,) if talk.track else ())
+        self.by_speaker = self._group(lambda talk: talk.speakers)
+        self.day_labels = {
+            day: day_talks[0].start.strftime("%A, %d de %B de %Y")
+            for day, day_talks in self.by_day.items()
+        }
+        self._postings = None
+        self._vocabulary = None
+        self._retriever = None
+
+    def _group(self, keys_of):
+        groups = {}
+        for talk in self.talks:
+            for key in keys_of(talk):
+                groups.setdefault(key, []).append(talk)
+        return {key: tuple(groups[key]) for key in sorted(groups, key=str)}
+
+    @classmethod
+    def from_schedule(cls, data, version=0):
+        """Build the index from the raw pretalx widget JSON"""
+        rooms = _names_by_key(data.get("rooms"), "id")
+        tracks = _names_by_key(data.get("tracks"), "id")
+        speakers = _names_by_key(data.get("speakers"), "code")
+        # Only actual talks have a 'code' (registration, breaks... don't)
+        talks = [
+            Talk.from_json(talk, rooms, tracks, speakers)
+            for talk in data.get("talks", ())
+            if talk.get("code") and talk.get("start")
+        ]
+        return cls(talks, version)
+
+    def _build_search_index(self):
+        """Inverted index token -> positions in ``self.talks``, built on first search"""
+        postings = {}
+        for position, talk in enumerate(self.talks):
+            for token in set(tokenize(talk.search_text())):
+                postings.setdefault(token, []).append(position)
+        postings = {token: frozenset(p) for token, p in postings.items()}
+        # The index is shared by every session: `_postings` tells search() the
+        # index is ready, so it's published last, once the vocabulary is set
+        self._vocabulary = sorted(postings)
+        self._postings = postings
+
+    def _matches(self, term, prefix=False):
+        if not prefix:
+            return self._postings.get(term, frozenset())
+        # Union of every token starting with `term`, found in the sorted vocabulary
+        matches = set()
+        i = bisect_left(self._vocabulary, term)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(term):
+            matches.update(self._postings[self._vocabulary[i]])
+            i += 1
+        return matches
+
+    def search(self, query="", room=None, track=None):
+        """Talks matching every word of `query` in title, abstract, speakers, room or track
+
+        The last word is matched as a prefix so results update while typing.
+        Results keep the start-time order.
+        """
+        if self._postings is None:
+            self._build_search_index()
+
+        terms = tokenize(query)
+        if terms:
+            positions = None
+            for i, term in enumerate(terms):
+                matches = self._matches(term, prefix=i == len(terms) - 1)
+                positions = matches if positions is None else positions & matches
+                if not positions:
+                    return ()
+            talks = [self.talks[position] for position in sorted(positions)]
+        else:
+            talks = self.talks
+
+        if room is not None:
+            talks = [talk for talk in talks if talk.room == room]
+        if track is not None:
+            talks = [talk for talk in talks if talk.track == track]
+        return tuple(talks)
+
+    @property
+    def retriever(self):
+        """BM25 retriever over the talks, built on first use"""
+        if self._retriever is None:
+            # Imported here to avoid a circular import
+            from core.retrieval import TalkRetriever
+
+            self._retriever = TalkRetriever(self.talks)
+        return self._retriever
+
+    def between(self, start, end):
+        """Talks starting in [start, end), using the sorted start-time array"""
+        lo = bisect_left(self.starts, start.timestamp())
+        hi = bisect_left(self.starts, end.timestamp(), lo=lo)
+        return self.talks[lo:hi]
+
+    def __len__(self):
+        return len(self.talks)
@@ -0,0 +1,554 @@
+"""SQLite data access for the user profiles page"""
+
+import csv
+import io
+import math
+import numbers
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from core.config import DATA_DIR
+from core.profiler import EXTERNAL, profiler
+
+DB_PATH = os.path.join(DATA_DIR, "users.db")
+POOL_SIZE = 8
+# Seconds between checks for writes made by other processes
+VERSION_CHECK_INTERVAL = 1.0
+QUERY_CACHE_SIZE = 256
+
+AFICIONES = [
+    "Programación",
+    "Videojuegos",
+    "Deportes",
+    "Lectura",
+    "Música",
+    "Cine y series",
+    "Viajes",
+    "Fotografía",
+    "Cocina",
+    "Arte y dibujo",
+    "Otra",
+]
+USER_COLUMNS = ["nombre", "edad", "le_gusta_python", "aficiones"]
+# Rows per transaction when importing, and per query when exporting
+CHUNK_SIZE = 10_000
+
+CREATE_USERS = """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT NOT NULL,
+        edad INTEGER NOT NULL,
+        le_gusta_python TEXT NOT NULL,
+        aficiones TEXT,
+        fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+# Change counter bumped by every write transaction, so every process sharing
+# the database can tell whether its cached queries are still valid
+CREATE_VERSION = (
+    "CREATE TABLE IF NOT EXISTS users_version (id INTEGER PRIMARY KEY CHECK (id = 0), n INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO users_version VALUES (0, 0)",
+)
+SELECT_VERSION = "SELECT n FROM users_version"
+BUMP_VERSION = "UPDATE users_version SET n = n + 1 RETURNING n"
+CREATE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_users_fecha_registro ON users (fecha_registro, id)",
+    "CREATE INDEX IF NOT EXISTS idx_users_nombre ON users (nombre, id)",
+    # Search-as-you-type, case-insensitive like the name filter's LIKE
+    "CREATE INDEX IF NOT EXISTS idx_users_nombre_nocase ON users (nombre COLLATE NOCASE, id)",
+    "CREATE INDEX IF NOT EXISTS idx_users_edad ON users (edad, id)",
+)
+SELECT_SUMMARY = """
+    SELECT COUNT(*), SUM(edad), COALESCE(SUM(le_gusta_python = 'Sí'), 0)
+    FROM users
+"""
+# Columns the listing can be sorted by, each backed by an index
+SORT_COLUMNS = ("fecha_registro", "nombre", "edad")
+PAGE_COLUMNS = """
+    id, nombre, edad, le_gusta_python, aficiones,
+    strftime('%d/%m/%Y %H:%M', fecha_registro) AS fecha_registro
+"""
+INSERT_USER = """
+    INSERT INTO users (nombre, edad, le_gusta_python, aficiones)
+    VALUES (?, ?, ?, ?)
+"""
+DELETE_USER = "DELETE FROM users WHERE id = ?"
+
+
+def _connect(path):
+    conn = sqlite3.connect(
+        path,
+        timeout=10,
+        check_same_thread=False,
+        # Per-connection cache of prepared statements
+        cached_statements=64,
+    )
+    # WAL lets readers run while a session writes; NORMAL is safe with WAL
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-16000")
+    conn.execute("PRAGMA busy_timeout=10000")
+    return conn
+
+
+def migrate(conn):
+    """Create the users table, or upgrade it from the old schema"""
+    cursor = conn.cursor()
+
+    # Check if table exists and get its columns
+    cursor.execute("PRAGMA table_info(users)")
+    columns = [column[1] for column in cursor.fetchall()]
+
+    if not columns:
+        # Table doesn't exist, create new one
+        cursor.execute(CREATE_USERS)
+    elif "le_gusta_python" not in columns:
+        # Table exists with the old schema: backup old data
+        cursor.execute("ALTER TABLE users RENAME TO users_old")
+        cursor.execute(CREATE_USERS)
+
+        # Try to migrate data if possible
+        try:
+            cursor.execute("""
+                INSERT INTO users (nombre, edad, le_gusta_python, aficiones, fecha_registro)
+                SELECT nombre,
+                       COALESCE(edad, 25) as edad,
+                       'Sí' as le_gusta_python,
+                       COALESCE(profesion, 'Sin especificar') as aficiones,
+                       fecha_registro
+                FROM users_old
+            """)
+        except sqlite3.Error:
+            # If migration fails, just start fresh
+            pass
+        cursor.execute("DROP TABLE users_old")
+
+    for statement in (*CREATE_VERSION, *CREATE_INDEXES):
+        cursor.execute(statement)
+    conn.commit()
+
+
+def validate_user(nombre, edad, le_gusta_python, aficiones):
+    """Error message for an invalid user, or None; the rules of the form"""
+    if not isinstance(nombre, str) or not nombre.strip():
+        return "⚠️ El campo Nombre es obligatorio"
+    if aficiones not in AFICIONES:
+        return "⚠️ Por favor, selecciona una afición"
+    if (
+        not isinstance(edad, numbers.Real)
+        or isinstance(edad, bool)
+        or math.isnan(edad)
+        or edad != int(edad)
+        or not 1 <= edad <= 120
+    ):
+        return "⚠️ La edad debe ser un número entero entre 1 y 120"
+    if le_gusta_python not in ("Sí", "No"):
+        return "⚠️ ¿Te gusta Python? debe ser 'Sí' o 'No'"
+    return None
+
+
+def read_user_chunks(file, file_name, chunk_size=CHUNK_SIZE):
+    """DataFrames of at most `chunk_size` rows from an uploaded CSV or Parquet file"""
+    if file_name.lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(file)
+        columns = [name for name in USER_COLUMNS if name in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            file,
+            chunksize=chunk_size,
+            dtype={"nombre": str, "le_gusta_python": str, "aficiones": str},
+            keep_default_na=False,
+            na_values={"edad": [""]},
+        )
+
+
+class UserSummary:
+    __slots__ = ("total", "age_sum", "python_lovers")
+
+    def __init__(self, total, age_sum, python_lovers):
+        self.total = total
+        self.age_sum = age_sum or 0
+        self.python_lovers = python_lovers
+
+    @property
+    def avg_age(self):
+        return self.age_sum / self.total if self.total else 0.0
+
+    def __neg__(self):
+        return UserSummary(-self.total, -self.age_sum, -self.python_lovers)
+
+    def __add__(self, other):
+        return UserSummary(
+            self.total + other.total,
+            self.age_sum + other.age_sum,
+            self.python_lovers + other.python_lovers,
+        )
+
+
+class UserRepository:
+    """Users table behind a fixed-size pool of SQLite connections
+
+    Connections are opened once per process and handed out to one thread at
+    a time, so script runs don't pay for a connect and no connection is
+    leaked when a query raises.
+
+    Query results and the summary are cached against the ``users_version``
+    change counter. Writes from this process update the summary
+    incrementally; writes from other processes are noticed within
+    `VERSION_CHECK_INTERVAL`. Until then, reruns don't touch SQLite at all.
+    """
+
+    def __init__(self, path=DB_PATH, pool_size=POOL_SIZE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(_connect(path))
+        # Serialized with the other processes opening the same database
+        with self.transaction() as conn:
+            migrate(conn)
+            self._version = conn.execute(SELECT_VERSION).fetchone()[0]
+        self._checked_at = time.monotonic()
+        self._summary = None
+        self._queries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get()
+        try:
+            # Time the connection is checked out, queries included
+            with profiler.timed("sqlite", kind=EXTERNAL):
+                yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Connection whose changes are committed on success, rolled back on error
+
+        The write lock is taken up front (BEGIN IMMEDIATE), so a transaction
+        that reads before writing waits for other writers within the busy
+        timeout instead of failing to upgrade its lock with SQLITE_BUSY.
+        """
+        with self.connection() as conn:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                yield conn
+
+    def _invalidate(self, version):
+        """Drop every cached result; call with the lock held"""
+        self._version = version
+        self._summary = None
+        self._queries.clear()
+
+    def _sync(self):
+        """Notice writes made by other processes, at most once per interval"""
+        if time.monotonic() - self._checked_at < VERSION_CHECK_INTERVAL:
+            return
+        self._checked_at = time.monotonic()
+        with self.connection() as conn:
+            version = conn.execute(SELECT_VERSION).fetchone()[0]
+        with self._lock:
+            if version != self._version:
+                self._invalidate(version)
+
+    def _cached(self, key, query):
+        """Result of `query()`, cached until the data version changes"""
+        self._sync()
+        with self._lock:
+            version = self._version
+            if key in self._queries:
+                self._queries.move_to_end(key)
+                profiler.cache("users_queries", hit=True)
+                return self._queries[key]
+        profiler.cache("users_queries", hit=False)
+        result = query()
+        with self._lock:
+            # Don't cache a result that a concurrent write made stale
+            if self._version == version:
+                self._queries[key] = result
+                while len(self._queries) > QUERY_CACHE_SIZE:
+                    self._queries.popitem(last=False)
+        return result
+
+    def _committed(self, version, change=None):
+        """Record a write of this process that moved the data to `version`
+
+        `change` is the `UserSummary` of the users added (negative for
+        removed users), used to update the summary without re-aggregating.
+        """
+        with self._lock:
+            if version <= self._version:
+                # A later write already invalidated the cache
+                return
+            # Incremental only if no other write happened in between
+            summary = self._summary if version == self._version + 1 else None
+            self._invalidate(version)
+            if summary is not None and change is not None:
+                self._summary = summary + change
+
+    def get_summary(self):
+        """Total users, average age and python lovers"""
+        self._sync()
+        summary = self._summary
+        profiler.cache("users_summary", hit=summary is not None)
+        if summary is None:
+            with self._lock:
+                version = self._version
+            with self.connection() as conn:
+                summary = UserSummary(*conn.execute(SELECT_SUMMARY).fetchone())
+            with self._lock:
+                if self._version == version:
+                    self._summary = summary
+        return summary
+
+    @staticmethod
+    def _where(nombre=None, le_gusta_python=None, aficiones=None):
+        conditions, params = [], []
+        if nombre:
+            conditions.append("nombre LIKE ? ESCAPE '\\'")
+            escaped = nombre.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            params.append(f"%{escaped}%")
+        if le_gusta_python:
+            conditions.append("le_gusta_python = ?")
+            params.append(le_gusta_python)
+        if aficiones:
+            conditions.append("aficiones = ?")
+            params.append(aficiones)
+        return conditions, params
+
+    def count_users(self, **filters):
+        """Number of users matching the filters"""
+        conditions, params = self._where(**filters)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        def query():
+            with self.connection() as conn:
+                sql = f"SELECT COUNT(*) FROM users {where}"
+                return conn.execute(sql, params).fetchone()[0]
+
+        return self._cached(("count", where, tuple(params)), query)
+
+    def get_users_page(
+        self,
+        page_size=50,
+        after=None,
+        sort="fecha_registro",
+        descending=True,
+        **filters,
+    ):
+        """One page of users, filtered and sorted in SQLite
+
+        Uses keyset pagination: `after` is the cursor returned with the
+        previous page, so a page costs the same wherever it is in the table.
+        Returns the page as a DataFrame and the cursor of the next page, or
+        None on the last one.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort users by {sort!r}")
+        order = "DESC" if descending else "ASC"
+        conditions, params = self._where(**filters)
+        if after is not None:
+            conditions.append(f"(users.{sort}, id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        sql = (
+            # Qualified, as fecha_registro is also the formatted output column
+            f"SELECT {PAGE_COLUMNS}, users.{sort} FROM users {where}"
+            f" ORDER BY users.{sort} {order}, id {order} LIMIT ?"
+        )
+        params.append(page_size + 1)
+
+        def query():
+            with self.connection() as conn:
+                return conn.execute(sql, params).fetchall()
+
+        return self._cached(("page", sql, tuple(params)), lambda: self._page(query(), page_size))
+
+    @staticmethod
+    def _page(rows, page_size):
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = (rows[-1][-1], rows[-1][0])
+        page = pd.DataFrame(
+            [row[:-1] for row in rows],
+            columns=["id", "nombre", "edad", "le_gusta_python", "aficiones", "fecha_registro"],
+        )
+        return page, next_cursor
+
+    def insert_user(self, nombre, edad, le_gusta_python, aficiones):
+        """Insert a new user into the database"""
+        try:
+            with self.transaction() as conn:
+                conn.execute(INSERT_USER, (nombre, edad, le_gusta_python, aficiones))
+                version = conn.execute(BUMP_VERSION).fetchone()[0]
+            self._committed(version, UserSummary(1, edad, int(le_gusta_python == "Sí")))
+            return True, "Usuario añadido correctamente"
+        except Exception as e:
+            return False, f"Error: {str(e)}"
+
+    def import_users(self, chunks, max_errors=100):
+        """Validate and insert users from an iterable of DataFrames
+
+        Each chunk is inserted with ``executemany`` in its own transaction,
+        so an upload is never held in memory whole. Returns the number of
+        imported users and up to `max_errors` ``(row, message)`` rejections.
+        """
+        imported, errors, row_number = 0, [], 0
+        for chunk in chunks:
+            missing = set(USER_COLUMNS) - set(chunk.columns)
+            if missing:
+                errors.append((row_number + 1, f"Faltan columnas: {', '.join(sorted(missing))}"))
+                break
+            # One non-numeric age makes pandas read the whole column as
+            # text: coerce it, so only that row is rejected
+            chunk = chunk.assign(edad=pd.to_numeric(chunk["edad"], errors="coerce"))
+
+            rows = []
+            for nombre, edad, le_gusta_python, aficiones in chunk[USER_COLUMNS].itertuples(
+                index=False, name=None
+            ):
+                row_number += 1
+                if isinstance(nombre, str):
+                    nombre = nombre.strip()
+                error = validate_user(nombre, edad, le_gusta_python, aficiones)
+                if error is None:
+                    rows.append((nombre, int(edad), le_gusta_python, aficiones))
+                elif len(errors) < max_errors:
+                    errors.append((row_number, error))
+            if not rows:
+                continue
+
+            with self.transaction() as conn:
+                conn.executemany(INSERT_USER, rows)
+                version = conn.execute(BUMP_VERSION).fetchone()[0]
+            self._committed(
+                version,
+                UserSummary(
+                    len(rows),
+                    sum(row[1] for row in rows),
+                    sum(row[2] == "Sí" for row in rows),
+                ),
+            )
+            imported += len(rows)
+        return imported, errors
+
+    def iter_users(self, chunk_size=CHUNK_SIZE):
+        """Every user, as DataFrames of at most `chunk_size` rows, in id order"""
+        last_id = 0
+        while True:
+            with self.connection() as conn:
+                rows = conn.execute(
+                    f"SELECT {PAGE_COLUMNS} FROM users WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, chunk_size),
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield pd.DataFrame(rows, columns=["id", *USER_COLUMNS, "fecha_registro"])
+
+    def export_csv(self, file):
+        """Write every user as CSV to the binary `file`, chunk by chunk"""
+        text = io.TextIOWrapper(file, encoding="utf-8", newline="", write_through=True)
+        header = True
+        for chunk in self.iter_users():
+            chunk.to_csv(text, index=False, header=header, quoting=csv.QUOTE_MINIMAL)
+            header = False
+        if header:
+            text.write(",".join(["id", *USER_COLUMNS, "fecha_registro"]) + "\n")
+        # Leave `file` open for the caller
+        text.detach()
+
+    def export_parquet(self, file):
+        """Write every user as Parquet to the binary `file`, one row group per chunk"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("nombre", pa.string()),
+                ("edad", pa.int64()),
+                ("le_gusta_python", pa.string()),
+                ("aficiones", pa.string()),
+                ("fecha_registro", pa.string()),
+            ]
+        )
+        with pq.ParquetWriter(file, schema) as writer:
+            for chunk in self.iter_users():
+                writer.write_table(pa.Table.from_pandas(chunk, schema, preserve_index=False))
+
+    def search_users(self, prefix, limit=20):
+        """``{id: nombre}`` of the first users whose name starts with `prefix`
+
+        A range scan on the case-insensitive nombre index, so it is cheap
+        whatever the table size. Like the name filter, case only matters
+        outside ASCII.
+        """
+        sql = (
+            "SELECT id, nombre FROM users"
+            " WHERE nombre >= ? COLLATE NOCASE AND nombre < ? COLLATE NOCASE"
+            " ORDER BY nombre COLLATE NOCASE, id LIMIT ?"
+        )
+        params = (prefix, prefix + "\U0010ffff", limit)
+
+        def query():
+            with self.connection() as conn:
+                return dict(conn.execute(sql, params).fetchall())
+
+        return self._cached(("search", sql, params), query)
+
+    def delete_users(self, user_ids):
+        """Delete several users in a single transaction"""
+        ids = [(user_id,) for user_id in dict.fromkeys(user_ids)]
+        if not ids:
+            return True
+        try:
+            with self.transaction() as conn:
+                # Aggregate what is about to go, to update the summary
+                placeholders = ", ".join("?" * len(ids))
+                deleted = UserSummary(
+                    *conn.execute(
+                        f"{SELECT_SUMMARY} WHERE id IN ({placeholders})",
+                        [user_id for (user_id,) in ids],
+                    ).fetchone()
+                )
+                if not deleted.total:
+                    return True
+                conn.executemany(DELETE_USER, ids)
+                version = conn.execute(BUMP_VERSION).fetchone()[0]
+            self._committed(version, -deleted)
+            return True
+        except Exception:
+            return False
+
+    def delete_user(self, user_id):
+        """Delete a user from the database"""
+        return self.delete_users([user_id])
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+@st.cache_resource
+def get_user_repository():
+    """Process-wide repository; the schema migration runs once, here"""
+    return UserRepository()
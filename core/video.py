@@ -0,0 +1,327 @@
+"""Webcam effects processed off the WebRTC receive thread
+
+`FramePipeline` hands each received frame to a small pool of worker threads
+(OpenCV releases the GIL while it works) and returns the latest processed
+frame right away. There is a single pending slot: when the workers fall
+behind, a new frame replaces the one still waiting, so the video skips
+frames instead of lagging further and further behind the camera.
+
+Effects come from a registry and are chained with `EffectChain`. They write
+into per-thread buffers allocated once per frame size, through OpenCV's
+``dst=`` arguments, instead of allocating new arrays on every frame.
+The pipeline only needs `av.VideoFrame`s, so it can be driven headless with
+synthetic frames (see benchmarks/bench_video.py).
+"""
+
+import threading
+import time
+from collections import deque
+
+import av
+import cv2
+import numpy as np
+
+# Frames and latencies kept to compute the rolling stats
+STATS_WINDOW = 120
+
+
+class Buffers:
+    """Output arrays of one worker thread, reallocated only when a shape changes"""
+
+    def __init__(self):
+        self._arrays = {}
+
+    def array(self, key, shape):
+        array = self._arrays.get(key)
+        if array is None or array.shape != shape:
+            array = self._arrays[key] = np.empty(shape, np.uint8)
+        return array
+
+
+# Kinds of effect
+LUT = "lut"  # pointwise, the same 256-entry table for every channel
+GRAY = "gray"  # BGR -> gray
+FILTER = "filter"  # func(src, dst), for gray or BGR images
+
+
+class Effect:
+    __slots__ = ("name", "kind", "lut", "func", "gray_input", "steps")
+
+    def __init__(self, name, kind=None, lut=None, func=None, gray_input=False, steps=None):
+        self.name = name
+        self.kind = kind
+        self.lut = None if lut is None else np.asarray(lut, np.uint8)
+        self.func = func
+        self.gray_input = gray_input
+        # A named shortcut for a chain of other effects
+        self.steps = steps
+
+
+EFFECTS = {}
+
+
+def register(name, **kwargs):
+    EFFECTS[name] = Effect(name, **kwargs)
+
+
+_levels = np.arange(256)
+register("Grayscale", kind=GRAY)
+register("Invert", kind=LUT, lut=255 - _levels)
+register("Threshold", kind=LUT, lut=np.where(_levels > 127, 255, 0))
+register("Brighten", kind=LUT, lut=np.round(255 * (_levels / 255) ** 0.6))
+register(
+    "Blur",
+    kind=FILTER,
+    func=lambda src, dst: cv2.GaussianBlur(src, (21, 21), 0, dst=dst),
+)
+register(
+    "Canny Edge",
+    kind=FILTER,
+    func=lambda src, dst: cv2.Canny(src, 100, 200, edges=dst),
+    gray_input=True,
+)
+register("Black & White", steps=("Grayscale", "Threshold"))
+
+
+def _lut_kernel(lut):
+    """Fastest OpenCV call computing `lut`, or None for the identity
+
+    ``cv2.LUT`` is a gather, several times slower than the SIMD kernels of
+    ``bitwise_not`` and ``threshold``, so the fused table is matched against
+    them first.
+    """
+    if (lut == _levels).all():
+        return None
+    if (lut == 255 - _levels).all():
+        return lambda src, dst: cv2.bitwise_not(src, dst=dst)
+    for low, high, mode in ((0, 255, cv2.THRESH_BINARY), (255, 0, cv2.THRESH_BINARY_INV)):
+        steps = np.flatnonzero(lut != low)
+        if len(steps) and (lut[steps[0] :] == high).all() and steps[0] > 0:
+            threshold = int(steps[0]) - 1
+            return lambda src, dst: cv2.threshold(src, threshold, 255, mode, dst=dst)[1]
+    return lambda src, dst: cv2.LUT(src, lut, dst=dst)
+
+
+def _expand(names):
+    for name in names:
+        effect = EFFECTS[name]
+        if effect.steps:
+            yield from _expand(effect.steps)
+        else:
+            yield effect
+
+
+class EffectChain:
+    """Effects applied in order, compiled into as few passes as possible
+
+    Adjacent LUT effects are composed into a single table, and an image
+    converted to gray stays single-channel until the end of the chain, so
+    the effects after a gray conversion touch a third of the data. With
+    ``scale`` < 1 the frame is processed at that fraction of its size and
+    scaled back up, trading resolution for frame rate.
+    """
+
+    def __init__(self, names=(), scale=1.0, fuse=True):
+        self.names = tuple(names)
+        self.scale = scale
+        self.label = " → ".join(self.names) or "Normal"
+        self.stages = self._compile(list(_expand(self.names)), fuse)
+
+    @staticmethod
+    def _compile(effects, fuse):
+        stages = []
+        lut = None
+        gray = False
+        for effect in effects:
+            if effect.kind == LUT:
+                # Applying a then b is the single table b[a]
+                lut = effect.lut if lut is None else effect.lut[lut]
+                if not fuse:
+                    stages.append((LUT, lut))
+                    lut = None
+                continue
+            if lut is not None:
+                stages.append((LUT, lut))
+                lut = None
+            if effect.kind == GRAY or effect.gray_input:
+                if not gray:
+                    stages.append((GRAY, None))
+                    gray = True
+            if effect.kind == FILTER:
+                stages.append((FILTER, effect.func))
+        if lut is not None:
+            stages.append((LUT, lut))
+        if gray:
+            stages.append(("bgr", None))
+
+        compiled = []
+        for kind, payload in stages:
+            if kind == LUT:
+                payload = _lut_kernel(payload)
+                if payload is None:
+                    continue
+                kind = FILTER
+            compiled.append((kind, payload))
+        return compiled
+
+    def __call__(self, img, buffers):
+        src = img
+        if self.scale < 1:
+            height, width = img.shape[:2]
+            size = (max(1, round(width * self.scale)), max(1, round(height * self.scale)))
+            src = cv2.resize(
+                img,
+                size,
+                dst=buffers.array("small", (size[1], size[0], 3)),
+                interpolation=cv2.INTER_AREA,
+            )
+
+        for i, (kind, payload) in enumerate(self.stages):
+            height, width = src.shape[:2]
+            if kind == GRAY:
+                src = cv2.cvtColor(
+                    src, cv2.COLOR_BGR2GRAY, dst=buffers.array(i, (height, width))
+                )
+            elif kind == "bgr":
+                src = cv2.cvtColor(
+                    src, cv2.COLOR_GRAY2BGR, dst=buffers.array(i, (height, width, 3))
+                )
+            else:
+                src = payload(src, buffers.array(i, src.shape))
+
+        if src.shape != img.shape:
+            src = cv2.resize(
+                src,
+                (img.shape[1], img.shape[0]),
+                dst=buffers.array("out", img.shape),
+                interpolation=cv2.INTER_LINEAR,
+            )
+        return src
+
+
+def apply_effect(chain, frame, buffers):
+    """Processed copy of an `av.VideoFrame`"""
+    img = frame.to_ndarray(format="bgr24")
+    # from_ndarray copies, so the buffers are free for the next frame
+    return av.VideoFrame.from_ndarray(chain(img, buffers), format="bgr24")
+
+
+class FramePipeline:
+    """Bounded pool of workers applying `chain` to the latest received frame"""
+
+    def __init__(self, chain=None, workers=2):
+        self.chain = chain if chain is not None else EffectChain()
+        self.workers = workers
+        self._condition = threading.Condition()
+        self._pending = None
+        self._latest = None
+        self._latest_seq = 0
+        self._seq = 0
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+        self._delivered_at = deque(maxlen=STATS_WINDOW)
+        self._received_at = deque(maxlen=STATS_WINDOW)
+        self._latency = {}
+        self._threads = [
+            threading.Thread(target=self._work, name=f"video-effects-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, frame):
+        """Queue `frame` for processing, replacing a frame still waiting"""
+        with self._condition:
+            self._seq += 1
+            self.received += 1
+            self._received_at.append(time.perf_counter())
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (self._seq, frame, self.chain)
+            self._condition.notify()
+
+    def _work(self):
+        buffers = Buffers()
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                seq, frame, chain = self._pending
+                self._pending = None
+
+            start = time.perf_counter()
+            processed = apply_effect(chain, frame, buffers)
+            elapsed = time.perf_counter() - start
+
+            with self._condition:
+                latency = self._latency.setdefault(chain.label, deque(maxlen=STATS_WINDOW))
+                latency.append(elapsed)
+                if seq > self._latest_seq:
+                    self._latest_seq = seq
+                    self._latest = processed
+                    self._delivered_at.append(time.perf_counter())
+                else:
+                    # Another worker already finished a newer frame
+                    self.dropped += 1
+                self._condition.notify_all()
+
+    def recv(self, frame):
+        """Submit `frame` and return the most recent processed frame
+
+        Until the first frame is processed the input is returned unchanged.
+        """
+        self.submit(frame)
+        with self._condition:
+            latest = self._latest
+        if latest is None:
+            return frame
+        latest.pts = frame.pts
+        if frame.time_base is not None:
+            latest.time_base = frame.time_base
+        return latest
+
+    def wait_idle(self, timeout=5):
+        """Block until nothing is pending, e.g. at the end of a headless run"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._pending is not None and time.monotonic() < deadline:
+                self._condition.wait(deadline - time.monotonic())
+
+    def stats(self):
+        """Achieved and input FPS, dropped frames and latency per chain in ms"""
+        with self._condition:
+            delivered = list(self._delivered_at)
+            received = list(self._received_at)
+            latency = {label: list(values) for label, values in self._latency.items()}
+            dropped = self.dropped
+            total = self.received
+        return {
+            "fps": _rate(delivered),
+            "input_fps": _rate(received),
+            "received": total,
+            "dropped": dropped,
+            "latency_ms": {
+                label: {
+                    "mean": 1000 * sum(values) / len(values),
+                    "p95": 1000 * sorted(values)[int(0.95 * (len(values) - 1))],
+                }
+                for label, values in latency.items()
+            },
+        }
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=1)
+
+
+def _rate(times):
+    """Events per second over a window of perf_counter timestamps"""
+    if len(times) < 2 or times[-1] == times[0]:
+        return 0.0
+    return (len(times) - 1) / (times[-1] - times[0])
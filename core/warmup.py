@@ -0,0 +1,93 @@
+"""Background import of the modules that pages defer
+
+    python -m core.warmup run streamlit_app.py [streamlit options]
+
+Runs the Streamlit server like `streamlit run`. With APP_WARMUP=1 it also
+starts a thread in the server process that waits for the health check to
+pass and then imports the heavy modules. So the first visit to the chat or
+video pages finds them already loaded. Under a plain `streamlit run` the
+warm-up only starts with the first session, racing that session's imports.
+"""
+
+import importlib
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+import streamlit as st
+from streamlit import runtime
+
+from core.profiler import BLOCK, profiler
+
+ENABLED = os.environ.get("APP_WARMUP", "").lower() in ("1", "true", "yes")
+# Roughly in order of how soon a visitor needs them
+MODULES = ("pandas", "numpy", "openai", "cv2", "av", "streamlit_webrtc")
+HEALTH_TIMEOUT = 60
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def wait_until_healthy(url, timeout=HEALTH_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def warm_up(modules=MODULES, health_url=None):
+    """Import `modules` one by one, after `health_url` answers if given"""
+    if health_url is not None and not wait_until_healthy(health_url):
+        return
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        profiler.record(BLOCK, f"warmup.{name}", time.perf_counter() - start)
+
+
+def health_url():
+    base_path = st.get_option("server.baseUrlPath").strip("/")
+    prefix = f"/{base_path}" if base_path else ""
+    return f"http://localhost:{st.get_option('server.port')}{prefix}/_stcore/health"
+
+
+def _warm_up_server():
+    # The health URL needs the server options, loaded before the runtime starts
+    deadline = time.monotonic() + HEALTH_TIMEOUT
+    while not runtime.exists():
+        if time.monotonic() > deadline:
+            return
+        time.sleep(0.1)
+    warm_up(health_url=health_url())
+
+
+def start_warmup():
+    """Start the warm-up thread, once per process"""
+    global _thread
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_warm_up_server, name="warmup", daemon=True)
+            _thread.start()
+    return _thread
+
+
+if __name__ == "__main__":
+    from streamlit.web import cli
+
+    # Through the package, so the app's `core.warmup` sees the thread started
+    from core import warmup
+
+    if warmup.ENABLED:
+        warmup.start_warmup()
+    sys.exit(cli.main())
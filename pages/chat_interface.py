@@ -1,22 +1,13 @@
 import streamlit as st
-import openai
 from datetime import datetime
 import os
-import requests
-
-@st.cache_data
-def fetch_schedule()->dict:
-    """Fetch schedule data from PyConES API"""
-    try:
-        response = requests.get(
-            "https://pretalx.com/pycones-2025/schedule/v/0.3/widgets/schedule.json"
-        )
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        st.error(f"Error al cargar el horario: {e}")
-        return None
 
+from core.chat import get_openai_response, stream_openai_response
+from core.chat_history import ChatHistory
+from core.chat_pipeline import get_pipeline
+from core.profiler import timed
+from core.response_cache import get_response_cache
+from core.schedule import fetch_schedule_index, get_schedule_store
 
 
 st.set_page_config(
@@ -27,6 +18,13 @@ st.set_page_config(
 
 st.title("🤖 Chat con IA - PyConES 2025")
 
+# Optionally send model calls through the shared, concurrency-limited
+# async pipeline instead of the script thread
+if os.environ.get("CHAT_ASYNC_PIPELINE") == "1":
+    get_response, stream_response = get_pipeline().complete, get_pipeline().stream
+else:
+    get_response, stream_response = get_openai_response, stream_openai_response
+
 
 with st.sidebar:
     st.header("⚙️ Configuración")
@@ -55,82 +53,51 @@ with st.sidebar:
         value=0.7,
         step=0.1
     )
+
+    # Streaming shows the first tokens as soon as they are generated
+    streaming = st.toggle("Respuesta en streaming", value=True)
     
     st.markdown("---")
     
+    # Shared by every session of this process
+    response_cache = get_response_cache()
+
     # Chat statistics
     if "messages" in st.session_state:
         st.markdown("### 📊 Estadísticas")
         total_messages = len(st.session_state.messages)
-        user_messages = len([m for m in st.session_state.messages if m["role"] == "user"])
+        user_messages = len([m for m in st.session_state.messages if m.role == "user"])
         st.metric("Total mensajes", total_messages)
         st.metric("Mis mensajes", user_messages)
+        st.metric("Respuestas desde caché", f"{response_cache.hit_rate:.0%}")
+        st.metric("Tiempo ahorrado", f"{response_cache.seconds_saved:.1f} s")
     
     # Clear chat button
     if st.button("🗑️ Limpiar Chat", use_container_width=True):
-        st.session_state.messages = []
+        st.session_state.messages = ChatHistory()
         st.rerun()
 
-def get_openai_response(messages, api_key, model, temperature):
-    """Get response from OpenAI API"""
-    try:
-        client = openai.OpenAI(api_key=api_key)
-
-        # st.write(fetch_schedule())
-        
-        # Add system message for context
-        system_message = {
-            "role": "system",
-            "content": f"""Eres un asistente útil y amigable para PyConES 2025, la conferencia de Python en España. 
-            Puedes ayudar con preguntas sobre:
-            - Python y programación
-            - Streamlit y desarrollo web
-            - PyConES 2025 y la comunidad Python
-            - Tecnología en general
-            
-            Responde en español de manera clara y concisa.
-            Usa la siguiente información para ayudar con los schedules y charlas de PyConES 2025:
-            {fetch_schedule()["talks"][:50] if fetch_schedule() else "No se pudo cargar la información del horario."}
-            """
-        }
-        
-        # Prepare messages for API
-        api_messages = [system_message] + messages
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=api_messages,
-            temperature=temperature,
-            max_tokens=500
-        )
-        
-        return response.choices[0].message.content
-        
-    except openai.AuthenticationError:
-        return "❌ Error de autenticación. Verifica tu API key de OpenAI."
-    except openai.RateLimitError:
-        return "⏱️ Has alcanzado el límite de uso. Intenta de nuevo más tarde."
-    except Exception as e:
-        return f"❌ Error: {str(e)}"
-
 # Initialize chat history
 if "messages" not in st.session_state:
-    st.session_state.messages = [
-        {
-            "role": "assistant",
-            "content": "¡Hola! 👋 Soy tu asistente de IA para PyConES 2025. ¿En qué puedo ayudarte?",
-            "timestamp": datetime.now().strftime("%H:%M")
-        }
-    ]
+    st.session_state.messages = ChatHistory()
+    st.session_state.messages.append(
+        "assistant",
+        "¡Hola! 👋 Soy tu asistente de IA para PyConES 2025. ¿En qué puedo ayudarte?",
+        datetime.now().strftime("%H:%M")
+    )
 
 # Display chat messages
+if st.session_state.messages.summarized:
+    st.caption(
+        f"🗜️ {st.session_state.messages.summarized} mensajes anteriores resumidos"
+    )
 for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
+    with st.chat_message(message.role):
         col1, col2 = st.columns([10, 1])
         with col1:
-            st.markdown(message["content"])
+            st.markdown(message.content)
         with col2:
-            st.caption(message.get("timestamp", ""))
+            st.caption(message.timestamp)
 
 # Chat input
 if prompt := st.chat_input("Escribe tu mensaje aquí..."):
@@ -141,11 +108,7 @@ if prompt := st.chat_input("Escribe tu mensaje aquí..."):
     
     # Add user message
     timestamp = datetime.now().strftime("%H:%M")
-    st.session_state.messages.append({
-        "role": "user",
-        "content": prompt,
-        "timestamp": timestamp
-    })
+    st.session_state.messages.append("user", prompt, timestamp)
     
     # Display user message
     with st.chat_message("user"):
@@ -155,24 +118,50 @@ if prompt := st.chat_input("Escribe tu mensaje aquí..."):
         with col2:
             st.caption(timestamp)
     
+    # Prepare messages for OpenAI API: the recent turns that fit in the
+    # token budget plus a summary of the older ones
+    with timed("chat.prepare"):
+        api_messages = st.session_state.messages.api_messages()
+        index = fetch_schedule_index()
+        cache_key = response_cache.key(
+            api_messages, model, temperature, get_schedule_store().checksum
+        )
+
     # Get AI response
     with st.chat_message("assistant"):
-        with st.spinner("Pensando..."):
-            # Prepare messages for OpenAI API (exclude timestamps)
-            api_messages = [
-                {"role": msg["role"], "content": msg["content"]} 
-                for msg in st.session_state.messages 
-                if msg["role"] in ["user", "assistant"]
-            ]
-            
-            response = get_openai_response(api_messages, api_key, model, temperature)
+        if streaming:
+            # Add the AI response to history first and fill it as tokens
+            # arrive, so a stopped run keeps the partial answer
+            reply = st.session_state.messages.append(
+                "assistant", "", datetime.now().strftime("%H:%M")
+            )
+
+            def reply_chunks():
+                for text in response_cache.stream(
+                    cache_key,
+                    lambda: stream_response(
+                        api_messages, api_key, model, temperature, index
+                    ),
+                ):
+                    reply.content += text
+                    yield text
+
+            try:
+                st.write_stream(reply_chunks)
+            finally:
+                if not reply.content:
+                    reply.content = "⏹️ Respuesta cancelada."
+        else:
+            with st.spinner("Pensando..."):
+                response = response_cache.get_or_compute(
+                    cache_key,
+                    lambda: get_response(
+                        api_messages, api_key, model, temperature, index
+                    ),
+                )
+                
+            st.markdown(response)
             
-        st.markdown(response)
-        
-        # Add AI response to history
-        ai_timestamp = datetime.now().strftime("%H:%M")
-        st.session_state.messages.append({
-            "role": "assistant",
-            "content": response,
-            "timestamp": ai_timestamp
-        })
+            # Add AI response to history
+            ai_timestamp = datetime.now().strftime("%H:%M")
+            st.session_state.messages.append("assistant", response, ai_timestamp)
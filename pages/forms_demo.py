@@ -1,58 +1,119 @@
 import streamlit as st
-import time
-import pandas as pd
-from datetime import datetime
+
+from core.rerun_meter import LOG_KEY, measure_run, run_summary, trigger
 
 st.title("📝 Forms Demo")
 
 # Initialize session state
 if 'form_submissions' not in st.session_state:
     st.session_state.form_submissions = []
-if 'counter' not in st.session_state:
-    st.session_state.counter = 0
-if 'performance_data' not in st.session_state:
-    st.session_state.performance_data = {'with_form': [], 'without_form': []}
 
+COLORS = ["Red", "Blue", "Green", "Yellow"]
 
-st.header("Basic Forms Demo")
 
-col1, col2 = st.columns(2)
+@st.fragment
+def fragment_demo():
+    # Only this function reruns when one of its widgets changes
+    with measure_run("fragment"):
+        name = st.text_input(
+            "Your name", key="name_fragment", on_change=trigger("fragment")
+        )
+        age = st.number_input(
+            "Your age",
+            min_value=0,
+            max_value=120,
+            key="age_fragment",
+            on_change=trigger("fragment"),
+        )
+        favorite_color = st.selectbox(
+            "Favorite color", COLORS, key="color_fragment", on_change=trigger("fragment")
+        )
+
+        if name:
+            st.success(f"Hello {name}! You are {age} years old and love {favorite_color.lower()}.")
+
+
+with measure_run("script"):
+    st.header("Basic Forms Demo")
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.subheader("❌ Without Form (Constant Reruns)")
+        st.markdown("*Every input change triggers a rerun of the whole page*")
+
+        # Regular widgets (no form)
+        name_no_form = st.text_input(
+            "Your name", key="name_no_form", on_change=trigger("no form")
+        )
+        age_no_form = st.number_input(
+            "Your age",
+            min_value=0,
+            max_value=120,
+            key="age_no_form",
+            on_change=trigger("no form"),
+        )
+        favorite_color_no_form = st.selectbox(
+            "Favorite color", COLORS, key="color_no_form", on_change=trigger("no form")
+        )
+
+        if name_no_form:
+            st.success(f"Hello {name_no_form}! You are {age_no_form} years old and love {favorite_color_no_form.lower()}.")
 
-with col1:
-    st.subheader("❌ Without Form (Constant Reruns)")
-    st.markdown("*Every input change triggers a rerun*")
-    
-    # Counter to show reruns
-    st.session_state.counter += 1
-    st.info(f"🔄 Page rerun count: {st.session_state.counter}")
-    
-    # Regular widgets (no form)
-    name_no_form = st.text_input("Your name", key="name_no_form")
-    age_no_form = st.number_input("Your age", min_value=0, max_value=120, key="age_no_form")
-    favorite_color_no_form = st.selectbox(
-        "Favorite color", 
-        ["Red", "Blue", "Green", "Yellow"], 
-        key="color_no_form"
-    )
-    
-    if name_no_form:
-        st.success(f"Hello {name_no_form}! You are {age_no_form} years old and love {favorite_color_no_form.lower()}.")
-    
     with col2:
         st.subheader("✅ With Form (Batched Input)")
         st.markdown("*Changes only applied when form is submitted*")
-        
+
         # Form widgets
         with st.form("basic_form", clear_on_submit=False):
             name_form = st.text_input("Your name", key="name_form")
             age_form = st.number_input("Your age", min_value=0, max_value=120, key="age_form")
-            favorite_color_form = st.selectbox(
-                "Favorite color", 
-                ["Red", "Blue", "Green", "Yellow"], 
-                key="color_form"
-            )
-            submit_basic = st.form_submit_button("Submit")
-        
+            favorite_color_form = st.selectbox("Favorite color", COLORS, key="color_form")
+            submit_basic = st.form_submit_button("Submit", on_click=trigger("form"))
+
         if submit_basic and name_form:
             st.success(f"Hello {name_form}! You are {age_form} years old and love {favorite_color_form.lower()}.")
             st.balloons()
+
+    with col3:
+        st.subheader("⚡ With Fragment (Partial Reruns)")
+        st.markdown("*Every input change reruns only this column*")
+        fragment_demo()
+
+
+# Not measured, so rendering the results doesn't skew them
+st.header("📊 Rerun Performance")
+st.markdown("""
+Each interaction is logged with what it reran (the whole `script` or just the
+`fragment`), the script execution time and the bytes of deltas sent to the
+browser. Fragment runs don't refresh this table: press *Refresh* after trying
+the fragment column.
+""")
+
+summary = run_summary()
+if summary.empty:
+    st.info("Interact with the three columns to compare them")
+else:
+    st.dataframe(
+        summary,
+        hide_index=True,
+        column_config={
+            "variant": "Variant",
+            "scope": "Reruns",
+            "runs": "Runs",
+            "mean_ms": st.column_config.NumberColumn("Mean time", format="%.1f ms"),
+            "max_ms": st.column_config.NumberColumn("Max time", format="%.1f ms"),
+            "mean_messages": st.column_config.NumberColumn("Mean messages", format="%.0f"),
+            "mean_delta_bytes": st.column_config.NumberColumn("Mean delta bytes", format="%.0f"),
+            "total_delta_bytes": "Total delta bytes",
+        },
+    )
+
+col1, col2 = st.columns(2)
+with col1:
+    st.button("🔄 Refresh", on_click=trigger("refresh"))
+with col2:
+    st.button(
+        "🗑️ Reset measurements",
+        on_click=lambda: st.session_state.update({LOG_KEY: []}),
+    )
@@ -1,86 +1,203 @@
 import streamlit as st
 
+from core.iva import (
+    ADD,
+    EXTRACT,
+    IVA_RATES,
+    RATE_NAMES,
+    RATES,
+    add_iva,
+    compute_batch,
+    extract_iva,
+    resolve_rates,
+    totals_by_rate,
+)
+from core.profiler import timed
+
 st.title("💰 Calculadora de IVA")
 
 st.markdown("""
 Calcula fácilmente el precio con IVA incluido o sin IVA según tus necesidades.
 """)
 
-# Tipo de cálculo
-calculation_type = st.radio(
-    "¿Qué quieres calcular?",
-    ["Añadir IVA al precio", "Extraer IVA del precio"],
-    horizontal=True,
-)
-
-col1, col2 = st.columns(2)
-
-with col1:
-    # Input del precio
-    if calculation_type == "Añadir IVA al precio":
-        price = st.number_input(
-            "Precio sin IVA (€)", min_value=0.0, value=100.0, step=0.01, format="%.2f"
-        )
-    else:
-        price = st.number_input(
-            "Precio con IVA (€)", min_value=0.0, value=121.0, step=0.01, format="%.2f"
-        )
-
-with col2:
-    # Selector de tipo de IVA
-    iva_options = {
-        "IVA General (21%)": 21,
-        "IVA Reducido (10%)": 10,
-        "IVA Superreducido (4%)": 4,
-        "Personalizado": "custom",
-    }
-
-    iva_type = st.selectbox("Tipo de IVA", list(iva_options.keys()))
-
-    if iva_options[iva_type] == "custom":
-        iva_rate = st.number_input(
-            "Porcentaje de IVA (%)",
-            min_value=0.0,
-            max_value=100.0,
-            value=21.0,
-            step=0.1,
-        )
-    else:
-        iva_rate = iva_options[iva_type]
-
-# Cálculos
-if calculation_type == "Añadir IVA al precio":
-    iva_amount = price * (iva_rate / 100)
-    final_price = price + iva_amount
-
-    st.markdown("---")
-    st.subheader("📊 Resultado")
-
-    col1, col2, col3 = st.columns(3)
-
-    with col1:
-        st.metric("Precio sin IVA", f"{price:.2f} €")
-
-    with col2:
-        st.metric("IVA", f"{iva_amount:.2f} €", f"{iva_rate}%")
-
-    with col3:
-        st.metric("Precio final", f"{final_price:.2f} €")
 
-else:  # Extraer IVA del precio
-    price_without_iva = price / (1 + iva_rate / 100)
-    iva_amount = price - price_without_iva
+# Each tab is a fragment: changing one of its inputs only reruns that tab
+@st.fragment
+def single_price():
+    # Tipo de cálculo
+    calculation_type = st.radio(
+        "¿Qué quieres calcular?",
+        ["Añadir IVA al precio", "Extraer IVA del precio"],
+        horizontal=True,
+    )
 
-    st.markdown("---")
-    st.subheader("📊 Resultado")
-
-    col1, col2, col3 = st.columns(3)
+    col1, col2 = st.columns(2)
 
     with col1:
-        st.metric("Precio con IVA", f"{price:.2f} €")
+        # Input del precio
+        if calculation_type == "Añadir IVA al precio":
+            price = st.number_input(
+                "Precio sin IVA (€)", min_value=0.0, value=100.0, step=0.01, format="%.2f"
+            )
+        else:
+            price = st.number_input(
+                "Precio con IVA (€)", min_value=0.0, value=121.0, step=0.01, format="%.2f"
+            )
 
     with col2:
-        st.metric("IVA", f"{iva_amount:.2f} €", f"{iva_rate}%")
-
-    with col3:
-        st.metric("Precio sin IVA", f"{price_without_iva:.2f} €")
+        # Selector de tipo de IVA, con los tipos de IGIC (Canarias) e IPSI
+        # (Ceuta y Melilla)
+        iva_options = {rate.label: rate.percent for rate in RATES}
+        iva_options["Personalizado"] = "custom"
+
+        iva_type = st.selectbox("Tipo de IVA", list(iva_options.keys()))
+
+        if iva_options[iva_type] == "custom":
+            iva_rate = st.number_input(
+                "Porcentaje de IVA (%)",
+                min_value=0.0,
+                max_value=100.0,
+                value=21.0,
+                step=0.1,
+            )
+        else:
+            iva_rate = iva_options[iva_type]
+
+    # Cálculos exactos en céntimos, redondeando como en una factura
+    if calculation_type == "Añadir IVA al precio":
+        result = add_iva(price, iva_rate)
+
+        st.markdown("---")
+        st.subheader("📊 Resultado")
+
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.metric("Precio sin IVA", f"{result.base} €")
+
+        with col2:
+            st.metric("IVA", f"{result.iva} €", f"{iva_rate:g}%")
+
+        with col3:
+            st.metric("Precio final", f"{result.total} €")
+
+    else:  # Extraer IVA del precio
+        result = extract_iva(price, iva_rate)
+
+        st.markdown("---")
+        st.subheader("📊 Resultado")
+
+        col1, col2, col3 = st.columns(3)
+
+        with col1:
+            st.metric("Precio con IVA", f"{result.total} €")
+
+        with col2:
+            st.metric("IVA", f"{result.iva} €", f"{iva_rate:g}%")
+
+        with col3:
+            st.metric("Precio sin IVA", f"{result.base} €")
+
+
+@st.fragment
+def batch_prices():
+    st.markdown("""
+    Sube un fichero CSV o Excel con una columna `precio` y, opcionalmente, una
+    columna `tipo_iva` por fila: `general` (o `iva general`), `reducido`,
+    `superreducido`, un tipo de IGIC o IPSI (`igic general`, `ipsi 4%`...) o un
+    porcentaje personalizado.
+    """)
+
+    batch_type = st.radio(
+        "Los precios del fichero",
+        ["No incluyen IVA", "Incluyen IVA"],
+        horizontal=True,
+    )
+    default_rate = st.selectbox(
+        "Tipo de IVA para las filas sin `tipo_iva`",
+        list(IVA_RATES),
+        format_func=lambda name: f"{name.capitalize()} ({IVA_RATES[name]:g}%)",
+    )
+    uploaded = st.file_uploader("Fichero de precios", type=["csv", "xlsx"])
+
+    if uploaded is not None:
+        # Only loaded once there's a file to read
+        import pandas as pd
+
+        if uploaded.name.lower().endswith(".csv"):
+            prices_df = pd.read_csv(
+                uploaded, usecols=lambda column: column in ("precio", "tipo_iva")
+            )
+        else:
+            prices_df = pd.read_excel(
+                uploaded, usecols=lambda column: column in ("precio", "tipo_iva")
+            )
+
+        if "precio" not in prices_df.columns:
+            st.error("⚠️ El fichero debe tener una columna `precio`")
+        else:
+            prices = pd.to_numeric(prices_df["precio"], errors="coerce")
+            invalid = int(prices.isna().sum())
+            if invalid:
+                st.warning(f"{invalid} filas sin un precio válido se han ignorado")
+                prices_df = prices_df[prices.notna()]
+                prices = prices[prices.notna()]
+
+            rates, labels = IVA_RATES[default_rate], RATE_NAMES[default_rate].label
+            if "tipo_iva" in prices_df.columns:
+                rates, labels = resolve_rates(prices_df["tipo_iva"], RATE_NAMES[default_rate])
+                unknown = pd.isna(rates)
+                if unknown.any():
+                    names = ", ".join(
+                        f"`{name}`"
+                        for name in prices_df["tipo_iva"][unknown].astype(str).unique()[:5]
+                    )
+                    st.warning(
+                        f"{int(unknown.sum())} filas con un `tipo_iva` desconocido se han "
+                        f"ignorado: {names}"
+                    )
+                    prices = prices[~unknown]
+                    rates = rates[~unknown]
+                    labels = labels[~unknown]
+
+            # Every row at once, column-wise
+            with timed("iva.batch"):
+                results = compute_batch(
+                    prices.to_numpy(),
+                    rates,
+                    ADD if batch_type == "No incluyen IVA" else EXTRACT,
+                    labels,
+                )
+
+            st.subheader("📊 Totales por tipo de IVA")
+            st.dataframe(
+                totals_by_rate(results),
+                hide_index=True,
+                column_config={
+                    "tipo": "Tipo",
+                    "tipo_iva": st.column_config.NumberColumn("Porcentaje", format="%g%%"),
+                    "lineas": "Líneas",
+                    "base": st.column_config.NumberColumn("Base", format="%.2f €"),
+                    "iva": st.column_config.NumberColumn("IVA", format="%.2f €"),
+                    "total": st.column_config.NumberColumn("Total", format="%.2f €"),
+                },
+            )
+
+            st.caption(f"Primeras filas de {len(results)}")
+            st.dataframe(results.head(100), hide_index=True)
+
+            st.download_button(
+                "⬇️ Descargar resultados (CSV)",
+                data=lambda: results.to_csv(index=False),
+                file_name="iva_resultados.csv",
+                mime="text/csv",
+            )
+
+
+single_tab, batch_tab = st.tabs(["🧮 Un precio", "📄 Lote de precios"])
+
+with single_tab:
+    single_price()
+
+with batch_tab:
+    batch_prices()
@@ -0,0 +1,80 @@
+import streamlit as st
+import pandas as pd
+
+from core.profiler import BLOCK, EXTERNAL, PAGE, profiler
+
+st.title("⏱️ Rendimiento")
+
+st.markdown("""
+Tiempos de este proceso sobre las últimas ejecuciones: páginas completas,
+bloques marcados con `timed()` y llamadas externas (pretalx, OpenAI, SQLite).
+""")
+
+if not profiler.enabled:
+    st.warning("La instrumentación está desactivada. Arranca la app con `APP_PROFILING=1`.")
+    st.stop()
+
+TIMING_COLUMNS = {
+    "name": "Nombre",
+    "count": "Muestras",
+    "errors": "Errores",
+    "mean_ms": st.column_config.NumberColumn("Media", format="%.1f ms"),
+    "p50_ms": st.column_config.NumberColumn("p50", format="%.1f ms"),
+    "p95_ms": st.column_config.NumberColumn("p95", format="%.1f ms"),
+    "p99_ms": st.column_config.NumberColumn("p99", format="%.1f ms"),
+}
+
+timings = pd.DataFrame(profiler.summary())
+
+for kind, title in (
+    (PAGE, "📄 Páginas"),
+    (BLOCK, "🧱 Bloques"),
+    (EXTERNAL, "🌐 Llamadas externas"),
+):
+    st.subheader(title)
+    rows = timings[timings["kind"] == kind] if not timings.empty else timings
+    if rows.empty:
+        st.caption("Sin muestras todavía")
+    else:
+        st.dataframe(
+            rows.drop(columns="kind").sort_values("p95_ms", ascending=False),
+            hide_index=True,
+            column_config=TIMING_COLUMNS,
+        )
+
+st.subheader("🗃️ Cachés")
+caches = pd.DataFrame(profiler.cache_summary())
+if caches.empty:
+    st.caption("Sin muestras todavía")
+else:
+    st.dataframe(
+        caches,
+        hide_index=True,
+        column_config={
+            "cache": "Caché",
+            "hits": "Aciertos",
+            "misses": "Fallos",
+            "hit_rate": st.column_config.ProgressColumn(
+                "Tasa de aciertos", format="percent", min_value=0, max_value=1
+            ),
+        },
+    )
+
+st.subheader("📦 Exportar")
+col1, col2, col3 = st.columns(3)
+with col1:
+    st.download_button(
+        "⬇️ Prometheus",
+        data=profiler.prometheus,
+        file_name="metrics.prom",
+        mime="text/plain",
+    )
+with col2:
+    st.download_button(
+        "⬇️ JSON Lines",
+        data=profiler.json_lines,
+        file_name="metrics.jsonl",
+        mime="application/x-ndjson",
+    )
+with col3:
+    st.button("🗑️ Reiniciar", on_click=profiler.reset)
@@ -1,96 +1,135 @@
 import streamlit as st
-import requests
-from datetime import datetime
-import pytz
+import pandas as pd
+import time
+
+from core.profiler import timed
+from core.schedule import fetch_schedule_index
 
 st.title("📅 Horario PyConES 2025")
 
 
-@st.cache_data
-def fetch_schedule():
-    """Fetch schedule data from PyConES API"""
-    try:
-        response = requests.get(
-            "https://pretalx.com/pycones-2025/schedule/v/0.3/widgets/schedule.json"
+def talks_table(talks):
+    """One row per talk"""
+    return pd.DataFrame(
+        {
+            "Hora": [talk.start.strftime("%H:%M") for talk in talks],
+            "Título": [talk.title for talk in talks],
+            "Sala": [talk.room for talk in talks],
+            "Track": [talk.track for talk in talks],
+            "Ponentes": [", ".join(talk.speakers) for talk in talks],
+            "Duración": [talk.duration for talk in talks],
+        }
+    )
+
+
+@st.cache_resource(max_entries=16)
+def day_table(_index, version, date):
+    """Table of the talks of the day, built once per schedule version"""
+    return talks_table(_index.by_day[date])
+
+
+def show_talk(talk):
+    """Render the details of a single talk"""
+    col1, col2 = st.columns([1, 2])
+
+    with col1:
+        st.write("**Detalles:**")
+        st.write(f"⏰ **Hora:** {talk.start.strftime('%H:%M')}")
+
+        if talk.duration:
+            st.write(f"⏱️ **Duración:** {talk.duration} min")
+
+        if talk.room:
+            st.write(f"🏢 **Sala:** {talk.room}")
+
+        if talk.track:
+            st.write(f"🎯 **Track:** {talk.track}")
+
+        st.write(f"🔖 **Código:** {talk.code}")
+
+    with col2:
+        if talk.abstract:
+            st.write("**Resumen:**")
+            st.write(talk.abstract[:500] + ("..." if len(talk.abstract) > 500 else ""))
+
+        if talk.speakers:
+            st.write("**Ponentes:**")
+            for speaker in talk.speakers:
+                st.write(f"👤 {speaker}")
+
+
+index = fetch_schedule_index()
+
+if index is not None:
+    compact = st.toggle(
+        "Vista compacta",
+        value=True,
+        help="Muestra las charlas en una tabla y solo los detalles de la seleccionada",
+    )
+
+    query = st.text_input(
+        "🔍 Buscar charlas",
+        placeholder="Título, resumen, ponente, sala o track",
+    )
+    col1, col2 = st.columns(2)
+    with col1:
+        room = st.selectbox(
+            "🏢 Sala",
+            [None, *index.by_room],
+            format_func=lambda option: "Todas" if option is None else option,
         )
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        st.error(f"Error al cargar el horario: {e}")
-        return None
-
-
-data = fetch_schedule()
-
-if data and "talks" in data:
-    talks = data["talks"]
-
-    # Filter talks that have a 'code' field (actual talks, not registration/breaks)
-    actual_talks = [talk for talk in talks if "code" in talk and talk.get("code")]
-
-    # Group talks by date
-    talks_by_date = {}
-    for talk in actual_talks:
-        if "start" in talk:
-            # Parse the start time
-            start_time = datetime.fromisoformat(talk["start"].replace("Z", "+00:00"))
-            # Convert to Madrid timezone for display
-            madrid_tz = pytz.timezone("Europe/Madrid")
-            start_time_madrid = start_time.astimezone(madrid_tz)
-            date_key = start_time_madrid.strftime("%Y-%m-%d")
-
-            if date_key not in talks_by_date:
-                talks_by_date[date_key] = []
-            talks_by_date[date_key].append(talk)
-
-    # Display talks grouped by date
-    for date, day_talks in sorted(talks_by_date.items()):
-        date_obj = datetime.strptime(date, "%Y-%m-%d")
-        st.subheader(f"📆 {date_obj.strftime('%A, %d de %B de %Y')}")
-
-        # Sort talks by start time
-        day_talks.sort(key=lambda x: x.get("start", ""))
-
-        for talk in day_talks:
-            with st.expander(f"🎤 {talk.get('title', 'Sin título')}"):
-                col1, col2 = st.columns([1, 2])
-
-                with col1:
-                    st.write("**Detalles:**")
-                    if "start" in talk:
-                        start_time = datetime.fromisoformat(
-                            talk["start"].replace("Z", "+00:00")
-                        )
-                        madrid_tz = pytz.timezone("Europe/Madrid")
-                        start_time_madrid = start_time_madrid = start_time.astimezone(
-                            madrid_tz
-                        )
-                        st.write(f"⏰ **Hora:** {start_time_madrid.strftime('%H:%M')}")
-
-                    if "duration" in talk:
-                        st.write(f"⏱️ **Duración:** {talk['duration']} min")
-
-                    if "room" in talk:
-                        st.write(f"🏢 **Sala:** {talk['room']}")
-
-                    if "track" in talk:
-                        st.write(f"🎯 **Track:** {talk['track']}")
-
-                    if "code" in talk:
-                        st.write(f"🔖 **Código:** {talk['code']}")
-
-                with col2:
-                    if "abstract" in talk and talk["abstract"]:
-                        st.write("**Resumen:**")
-                        st.write(
-                            talk["abstract"][:500]
-                            + ("..." if len(talk["abstract"]) > 500 else "")
-                        )
-
-                    if "speakers" in talk and talk["speakers"]:
-                        st.write("**Ponentes:**")
-                        for speaker in talk["speakers"]:
-                            st.write(f"👤 {speaker}")
+    with col2:
+        track = st.selectbox(
+            "🎯 Track",
+            [None, *index.by_track],
+            format_func=lambda option: "Todos" if option is None else option,
+        )
+
+    filtered = bool(query.strip()) or room is not None or track is not None
+    if filtered:
+        # The inverted index is built once per schedule version
+        start = time.perf_counter()
+        with timed("schedule.search"):
+            results = index.search(query, room=room, track=track)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        st.caption(f"{len(results)} charlas encontradas en {elapsed_ms:.3f} ms")
+        if not results:
+            st.info("No hay charlas que coincidan con la búsqueda")
+
+        talks_by_date = {}
+        for talk in results:
+            talks_by_date.setdefault(talk.day, []).append(talk)
+    else:
+        talks_by_date = index.by_day
+
+    # Talks are parsed, localized to Madrid time, grouped by date and sorted
+    # once per schedule version, so a rerun only renders them
+    for date, day_talks in talks_by_date.items():
+        st.subheader(f"📆 {index.day_labels[date]}")
+
+        if compact:
+            event = st.dataframe(
+                talks_table(day_talks)
+                if filtered
+                else day_table(index, index.version, date),
+                hide_index=True,
+                on_select="rerun",
+                selection_mode="single-row",
+                # A new search resets the selection
+                key=f"talks_{date}_{query}_{room}_{track}",
+            )
+            # Details are rendered lazily, for the selected talk only
+            if event.selection.rows:
+                with st.container(border=True):
+                    talk = day_talks[event.selection.rows[0]]
+                    st.markdown(f"#### 🎤 {talk.title}")
+                    show_talk(talk)
+            else:
+                st.caption("Selecciona una charla para ver sus detalles")
+        else:
+            for talk in day_talks:
+                with st.expander(f"🎤 {talk.title}"):
+                    show_talk(talk)
 else:
     st.error("No se pudo cargar el horario. Por favor, inténtalo más tarde.")
     st.info(
@@ -1,151 +1,73 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
-import os
+import io
 
-st.title("👥 Gestión de Perfiles de Usuario")
-
-# Database setup
-DATA_DIR = "data"
-DB_PATH = os.path.join(DATA_DIR, "users.db")
-
-# Create data directory if it doesn't exist
-os.makedirs(DATA_DIR, exist_ok=True)
-
-
-def init_db():
-    """Initialize the SQLite database and create the users table if it doesn't exist"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Check if table exists and get its columns
-    cursor.execute("PRAGMA table_info(users)")
-    columns = [column[1] for column in cursor.fetchall()]
-
-    if not columns:
-        # Table doesn't exist, create new one
-        cursor.execute("""
-            CREATE TABLE users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nombre TEXT NOT NULL,
-                edad INTEGER NOT NULL,
-                le_gusta_python TEXT NOT NULL,
-                aficiones TEXT,
-                fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-    else:
-        # Table exists, check if migration is needed
-        if "le_gusta_python" not in columns:
-            # Backup old data
-            cursor.execute("ALTER TABLE users RENAME TO users_old")
-
-            # Create new table
-            cursor.execute("""
-                CREATE TABLE users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    nombre TEXT NOT NULL,
-                    edad INTEGER NOT NULL,
-                    le_gusta_python TEXT NOT NULL,
-                    aficiones TEXT,
-                    fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Try to migrate data if possible
-            try:
-                cursor.execute("""
-                    INSERT INTO users (nombre, edad, le_gusta_python, aficiones, fecha_registro)
-                    SELECT nombre,
-                           COALESCE(edad, 25) as edad,
-                           'Sí' as le_gusta_python,
-                           COALESCE(profesion, 'Sin especificar') as aficiones,
-                           fecha_registro
-                    FROM users_old
-                """)
-
-                # Drop old table
-                cursor.execute("DROP TABLE users_old")
-
-            except sqlite3.Error:
-                # If migration fails, just start fresh
-                cursor.execute("DROP TABLE users_old")
-
-    conn.commit()
-    conn.close()
-
-
-def get_all_users():
-    """Get all users from the database"""
-    conn = sqlite3.connect(DB_PATH)
-    df = pd.read_sql_query("SELECT * FROM users ORDER BY fecha_registro DESC", conn)
-    conn.close()
-    return df
-
-
-def insert_user(nombre, edad, le_gusta_python, aficiones):
-    """Insert a new user into the database"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            """
-            INSERT INTO users (nombre, edad, le_gusta_python, aficiones)
-            VALUES (?, ?, ?, ?)
-        """,
-            (nombre, edad, le_gusta_python, aficiones),
-        )
+from core.profiler import timed
+from core.users import AFICIONES, get_user_repository, read_user_chunks, validate_user
 
-        conn.commit()
-        conn.close()
-        return True, "Usuario añadido correctamente"
-    except Exception as e:
-        return False, f"Error: {str(e)}"
-
-
-def delete_user(user_id):
-    """Delete a user from the database"""
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-        conn.commit()
-        conn.close()
-        return True
-    except Exception:
-        return False
+PAGE_SIZE = 50
 
+st.title("👥 Gestión de Perfiles de Usuario")
 
-# Initialize database
-init_db()
+# Database access goes through a process-wide connection pool; the schema
+# migration runs once, when the pool is created
+users = get_user_repository()
 
 # Display existing users
 st.subheader("📋 Usuarios Registrados")
 
-users_df = get_all_users()
-
-if not users_df.empty:
-    # Format the dataframe for better display
-    display_df = users_df.copy()
-    display_df["fecha_registro"] = pd.to_datetime(
-        display_df["fecha_registro"]
-    ).dt.strftime("%d/%m/%Y %H:%M")
+summary = users.get_summary()
 
-    # Display metrics
+if summary.total:
+    # Display metrics, aggregated in SQLite and cached until the next write
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total usuarios", len(users_df))
+        st.metric("Total usuarios", summary.total)
     with col2:
-        avg_age = users_df["edad"].mean() if users_df["edad"].notna().any() else 0
-        st.metric("Edad promedio", f"{avg_age:.1f} años")
+        st.metric("Edad promedio", f"{summary.avg_age:.1f} años")
     with col3:
-        python_lovers = len(users_df[users_df["le_gusta_python"] == "Sí"])
-        st.metric("Les gusta Python", f"{python_lovers}/{len(users_df)}")
+        st.metric("Les gusta Python", f"{summary.python_lovers}/{summary.total}")
+
+    # Filters and sorting run in SQLite
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        name_filter = st.text_input("Buscar por nombre")
+    with col2:
+        python_filter = st.selectbox("¿Le gusta Python?", ["Todos", "Sí", "No"])
+    with col3:
+        hobby_filter = st.selectbox("Afición", ["Todas", *AFICIONES])
+    with col4:
+        sort_options = {
+            "Más recientes": ("fecha_registro", True),
+            "Más antiguos": ("fecha_registro", False),
+            "Nombre": ("nombre", False),
+            "Edad": ("edad", False),
+        }
+        sort_label = st.selectbox("Ordenar por", list(sort_options))
+    sort, descending = sort_options[sort_label]
+    filters = {
+        "nombre": name_filter.strip(),
+        "le_gusta_python": None if python_filter == "Todos" else python_filter,
+        "aficiones": None if hobby_filter == "Todas" else hobby_filter,
+    }
+
+    # Keyset pagination: remember the cursor of every page visited so far,
+    # and start over whenever the filters or the order change
+    query = (tuple(filters.values()), sort, descending)
+    if st.session_state.get("users_query") != query:
+        st.session_state.users_query = query
+        st.session_state.users_cursors = [None]
+    cursors = st.session_state.users_cursors
+
+    with timed("users.page"):
+        users_df, next_cursor = users.get_users_page(
+            PAGE_SIZE, cursors[-1], sort, descending, **filters
+        )
+        matching = users.count_users(**filters) if any(filters.values()) else summary.total
+    first_row = (len(cursors) - 1) * PAGE_SIZE
 
     # Display the table
     st.dataframe(
-        display_df,
+        users_df,
         use_container_width=True,
         hide_index=True,
         column_config={
@@ -158,21 +80,61 @@ if not users_df.empty:
         },
     )
 
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Anterior", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.caption(
+            f"Mostrando {first_row + 1 if len(users_df) else 0}-{first_row + len(users_df)}"
+            f" de {matching} usuarios"
+        )
+    with col3:
+        if st.button("Siguiente ➡️", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
+
     # Delete functionality
     st.markdown("---")
-    with st.expander("🗑️ Eliminar usuario"):
-        user_to_delete = st.selectbox(
-            "Selecciona un usuario para eliminar:",
-            options=users_df["id"].tolist(),
-            format_func=lambda x: f"{users_df[users_df['id'] == x]['nombre'].iloc[0]} (ID: {x})",
+    with st.expander("🗑️ Eliminar usuarios"):
+        search = st.text_input(
+            "Buscar usuario por nombre",
+            placeholder="Empieza a escribir un nombre",
         )
-
-        if st.button("Eliminar usuario", type="secondary"):
-            if delete_user(user_to_delete):
-                st.success("Usuario eliminado correctamente")
+        # id -> name of the candidates, from the current page or a prefix
+        # search with a LIMIT, so labelling each option is a dict lookup
+        if search:
+            candidates = users.search_users(search)
+        else:
+            candidates = dict(zip(users_df["id"].tolist(), users_df["nombre"].tolist()))
+        # Users already selected stay selectable when the search changes
+        selected_names = st.session_state.get("delete_names", {})
+        options = {
+            user_id: selected_names[user_id]
+            for user_id in st.session_state.get("users_to_delete", [])
+            if user_id in selected_names
+        }
+        options.update(candidates)
+
+        users_to_delete = st.multiselect(
+            "Selecciona los usuarios a eliminar:",
+            options=list(options),
+            format_func=lambda x: f"{options[x]} (ID: {x})",
+            key="users_to_delete",
+        )
+        st.session_state.delete_names = {
+            user_id: options[user_id] for user_id in users_to_delete
+        }
+
+        if st.button("Eliminar usuarios", type="secondary", disabled=not users_to_delete):
+            # A single transaction, whatever the number of users
+            if users.delete_users(users_to_delete):
+                del st.session_state.users_to_delete
+                st.success("Usuarios eliminados correctamente")
                 st.rerun()
             else:
-                st.error("Error al eliminar el usuario")
+                st.error("Error al eliminar los usuarios")
 
 else:
     st.info("No hay usuarios registrados todavía")
@@ -195,37 +157,73 @@ with st.form("user_form", clear_on_submit=True):
 
         aficiones = st.selectbox(
             "Aficiones principales",
-            options=[
-                "Selecciona una opción",
-                "Programación",
-                "Videojuegos",
-                "Deportes",
-                "Lectura",
-                "Música",
-                "Cine y series",
-                "Viajes",
-                "Fotografía",
-                "Cocina",
-                "Arte y dibujo",
-                "Otra",
-            ],
+            options=["Selecciona una opción", *AFICIONES],
         )
 
     # Submit button
     submitted = st.form_submit_button("Guardar Usuario", type="primary")
 
     if submitted:
-        # Validation
-        if not nombre:
-            st.error("⚠️ El campo Nombre es obligatorio")
-        elif aficiones == "Selecciona una opción":
-            st.error("⚠️ Por favor, selecciona una afición")
+        # Validation, with the same rules as the bulk import
+        error = validate_user(nombre, edad, le_gusta_python, aficiones)
+        if error:
+            st.error(error)
         else:
             # Insert user
-            success, message = insert_user(nombre, edad, le_gusta_python, aficiones)
+            success, message = users.insert_user(nombre, edad, le_gusta_python, aficiones)
 
             if success:
                 st.success(f"✅ {message}")
                 st.rerun()  # Refresh the page to show the new user
             else:
                 st.error(f"❌ {message}")
+
+# Bulk import and export
+st.markdown("---")
+st.subheader("📦 Importar / Exportar")
+
+col1, col2 = st.columns(2)
+
+with col1:
+    uploaded = st.file_uploader(
+        "Importar usuarios (CSV o Parquet)",
+        type=["csv", "parquet"],
+        help="Columnas: nombre, edad, le_gusta_python (Sí/No) y aficiones",
+    )
+    if uploaded is not None and st.button("Importar", type="primary"):
+        with st.spinner("Importando..."):
+            # Read, validated and inserted chunk by chunk
+            imported, errors = users.import_users(
+                read_user_chunks(uploaded, uploaded.name)
+            )
+        if imported:
+            st.success(f"✅ {imported} usuarios importados")
+        if errors:
+            st.warning(f"{len(errors)} filas rechazadas")
+            st.dataframe(
+                [{"Fila": row, "Error": error} for row, error in errors],
+                hide_index=True,
+            )
+
+with col2:
+    st.write("Exportar usuarios")
+
+    def export(write):
+        # Generated only when the button is clicked, read from SQLite in
+        # chunks; Streamlit serves the finished file from memory
+        file = io.BytesIO()
+        write(file)
+        return file
+
+    st.download_button(
+        "⬇️ CSV",
+        data=lambda: export(users.export_csv),
+        file_name="usuarios.csv",
+        mime="text/csv",
+    )
+    st.download_button(
+        "⬇️ Parquet",
+        data=lambda: export(users.export_parquet),
+        file_name="usuarios.parquet",
+        mime="application/vnd.apache.parquet",
+    )
@@ -1,93 +1,169 @@
+import os
+
 import streamlit as st
-import cv2
-import numpy as np
-import av
 from streamlit_webrtc import VideoProcessorBase, webrtc_streamer
 
+from core.video import EFFECTS, EffectChain, FramePipeline
+
 st.set_page_config(layout="wide")
 st.title("Webcam Effects Demo")
 
-st.warning("This demo is deactivated")
-
-# Video processor compatible with streamlit-webrtc's current API
-# class VideoProcessor(VideoProcessorBase):
-#     def __init__(self):
-#         # default; will be updated from the sidebar selection below
-#         self.effect = "Normal"
-
-#     def recv(self, frame):
-#         img = frame.to_ndarray(format="bgr24")
-
-#         effect = getattr(self, "effect", "Normal")
-
-#         if effect == "Normal":
-#             processed_img = img
-
-#         elif effect == "Grayscale":
-#             processed_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-#             processed_img = cv2.cvtColor(processed_img, cv2.COLOR_GRAY2BGR)
-
-#         elif effect == "Canny Edge":
-#             edges = cv2.Canny(img, 100, 200)
-#             processed_img = cv2.cvtColor(edges, cv2.COLOR_GRAY2BGR)
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".webm", ".mkv")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
 
-#         elif effect == "Black & White":
-#             gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-#             _, bw = cv2.threshold(gray, 127, 255, cv2.THRESH_BINARY)
-#             processed_img = cv2.cvtColor(bw, cv2.COLOR_GRAY2BGR)
 
-#         elif effect == "Blur":
-#             processed_img = cv2.GaussianBlur(img, (21, 21), 0)
-
-#         elif effect == "Invert":
-#             processed_img = cv2.bitwise_not(img)
-
-#         else:
-#             processed_img = img
-
-#         return av.VideoFrame.from_ndarray(processed_img, format="bgr24")
-
-# # Sidebar for effect selection
-# st.sidebar.title("Choose a filter")
-# selected_effect = st.sidebar.selectbox(
-#     "Select a real-time video effect",
-#     ("Normal", "Grayscale", "Canny Edge", "Black & White", "Blur", "Invert"),
-# )
+# Video processor compatible with streamlit-webrtc's current API. Effects run
+# in a worker pool, off the thread receiving the frames
+class VideoProcessor(VideoProcessorBase):
+    def __init__(self, workers):
+        self.pipeline = FramePipeline(workers=workers)
 
-# # Start WebRTC and get a handle to the processor instance
-# webrtc_ctx = webrtc_streamer(
-#     key="webcam-with-effects",
-#     video_processor_factory=VideoProcessor,
-#     sendback_audio=False,
-# )
+    def recv(self, frame):
+        return self.pipeline.recv(frame)
 
-# # Update the running processor's effect live
-# if webrtc_ctx.video_processor:
-#     webrtc_ctx.video_processor.effect = selected_effect
+    def on_ended(self):
+        self.pipeline.close()
 
 
-st.code("""
-import streamlit as st
-....
+@st.cache_resource(max_entries=64)
+def effect_chain(names, scale):
+    """Compiled chain, shared by every session using the same effects"""
+    return EffectChain(names, scale)
 
-class VideoProcessor(VideoProcessorBase):
-    pass
 
 # Sidebar for effect selection
-st.sidebar.title("Choose a filter")
-selected_effect = st.sidebar.selectbox(
-    "Select a real-time video effect",
-    ("Normal", "Grayscale", "Canny Edge", "Black & White", "Blur", "Invert"),
+st.sidebar.title("Choose your filters")
+selected_effects = st.sidebar.multiselect(
+    "Video effects, applied in order",
+    list(EFFECTS),
+    help="Consecutive pointwise effects (Invert, Threshold, Brighten) are fused into a single pass",
 )
-
-# Start WebRTC and get a handle to the processor instance
-webrtc_ctx = webrtc_streamer(
-    key="webcam-with-effects",
-    video_processor_factory=VideoProcessor,
-    sendback_audio=False,
+scale = st.sidebar.select_slider(
+    "Processing resolution",
+    options=[0.25, 0.5, 0.75, 1.0],
+    value=1.0,
+    format_func=lambda value: f"{value:.0%}",
+    help="Process smaller frames and scale them back up, for a higher frame rate. "
+    "Worth it for Blur and Canny Edge; pointwise effects are cheaper than the resize",
 )
 
-# Update the running processor's effect live
-if webrtc_ctx.video_processor:
-    webrtc_ctx.video_processor.effect = selected_effect
-""", language="python")
\ No newline at end of file
+mode = st.radio("Source", ["📷 Live camera", "📁 Files"], horizontal=True)
+
+if mode == "📷 Live camera":
+    workers = st.sidebar.slider(
+        "Worker threads",
+        min_value=1,
+        max_value=4,
+        value=2,
+        help="Applied the next time the camera starts",
+    )
+
+    # Start WebRTC and get a handle to the processor instance
+    webrtc_ctx = webrtc_streamer(
+        key="webcam-with-effects",
+        video_processor_factory=lambda: VideoProcessor(workers),
+        media_stream_constraints={"video": True, "audio": False},
+        sendback_audio=False,
+    )
+
+    # Update the running processor's effects live
+    if webrtc_ctx.video_processor:
+        webrtc_ctx.video_processor.pipeline.chain = effect_chain(tuple(selected_effects), scale)
+
+    @st.fragment(run_every=1)
+    def show_stats():
+        """Achieved FPS, dropped frames and latency of the running pipeline"""
+        processor = webrtc_ctx.video_processor
+        if processor is None:
+            st.caption("Start the camera to see the pipeline stats")
+            return
+
+        stats = processor.pipeline.stats()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Output FPS", f"{stats['fps']:.1f}")
+        col2.metric("Camera FPS", f"{stats['input_fps']:.1f}")
+        col3.metric(
+            "Dropped frames",
+            stats["dropped"],
+            f"{stats['dropped'] / stats['received']:.0%}" if stats["received"] else None,
+            delta_color="off",
+        )
+        st.dataframe(
+            [
+                {"Effects": label, "Mean (ms)": latency["mean"], "p95 (ms)": latency["p95"]}
+                for label, latency in stats["latency_ms"].items()
+            ],
+            hide_index=True,
+        )
+
+
+    show_stats()
+
+else:
+    st.markdown("""
+    Apply the same effects to an uploaded video or a batch of images. Frames
+    are decoded as a stream and processed in parallel in a pool of processes.
+    """)
+    cpus = os.cpu_count() or 1
+    # A slider needs distinct bounds; one CPU means one process
+    processes = (
+        st.sidebar.slider(
+            "Processes",
+            min_value=1,
+            max_value=cpus,
+            value=cpus,
+            help="Workers of the server's shared pool this job keeps busy",
+        )
+        if cpus > 1
+        else 1
+    )
+    uploads = st.file_uploader(
+        "Video or images",
+        type=[extension.lstrip(".") for extension in VIDEO_EXTENSIONS + IMAGE_EXTENSIONS],
+        accept_multiple_files=True,
+    )
+    videos = [f for f in uploads if f.name.lower().endswith(VIDEO_EXTENSIONS)]
+    images = [f for f in uploads if f not in videos]
+
+    if len(videos) > 1 or (videos and images):
+        st.warning("Upload either a single video or a batch of images")
+    elif uploads and st.button("▶️ Process", type="primary"):
+        # Only needed once there's something to process
+        from core.media_batch import get_process_pool, process_images, process_video
+
+        progress = st.progress(0.0, "Processing…")
+
+        def on_progress(done, total):
+            progress.progress(min(done / total, 1.0) if total else 0.0, f"{done} frames")
+
+        process = process_video if videos else process_images
+        result = process(
+            videos[0] if videos else images,
+            tuple(selected_effects),
+            scale,
+            processes=processes,
+            pool=get_process_pool(),
+            on_progress=on_progress,
+        )
+        progress.empty()
+
+        # Keep only the latest result of the session on disk
+        previous = st.session_state.get("effects_result")
+        if previous is not None and os.path.exists(previous.path):
+            os.remove(previous.path)
+        st.session_state.effects_result = result
+
+    result = st.session_state.get("effects_result")
+    if result is not None and os.path.exists(result.path):
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Frames", result.frames)
+        col2.metric("Time", f"{result.seconds:.1f} s")
+        col3.metric("Throughput", f"{result.fps:.1f} frames/s")
+        is_video = result.path.endswith(".mp4")
+        st.download_button(
+            "⬇️ Download result",
+            # Read from disk only when downloaded
+            data=lambda: open(result.path, "rb"),
+            file_name="effects.mp4" if is_video else "effects.zip",
+            mime="video/mp4" if is_video else "application/zip",
+        )
@@ -1,5 +1,8 @@
 import streamlit as st
 
+from core import warmup
+from core.profiler import PAGE, profiler
+
 # Configure page
 st.set_page_config(
     page_title="Streamlit",
@@ -17,18 +20,26 @@ st.set_page_config(
 #     unsafe_allow_html=True,
 # )
 
+# Preload the heavy modules in the background (APP_WARMUP=1), unless
+# `python -m core.warmup run` already started it with the server
+if warmup.ENABLED:
+    warmup.start_warmup()
+
 # Navigation
-pg = st.navigation(
-    [
-        st.Page("pages/welcome.py", title="Welcome", icon="📊"),
-        st.Page("pages/schedule.py", title="PyConES 2025", icon="📅"),
-        st.Page("pages/iva_calculator.py", title="Calculadora IVA", icon="💰"),
-        st.Page("pages/user_profiles.py", title="Perfiles de Usuario", icon="👥"),
-        st.Page("pages/basic_example.py", title="Ejemplo Básico", icon="🐍"),
-        st.Page("pages/forms_demo.py", title="Forms Demo", icon="📝"),
-        st.Page("pages/video_camera.py", title="Efectos Webcam", icon="🎥"),
-        st.Page("pages/chat_interface.py", title="Chat con IA", icon="🤖"),
-    ]
-)
+pages = [
+    st.Page("pages/welcome.py", title="Welcome", icon="📊"),
+    st.Page("pages/schedule.py", title="PyConES 2025", icon="📅"),
+    st.Page("pages/iva_calculator.py", title="Calculadora IVA", icon="💰"),
+    st.Page("pages/user_profiles.py", title="Perfiles de Usuario", icon="👥"),
+    st.Page("pages/basic_example.py", title="Ejemplo Básico", icon="🐍"),
+    st.Page("pages/forms_demo.py", title="Forms Demo", icon="📝"),
+    st.Page("pages/video_camera.py", title="Efectos Webcam", icon="🎥"),
+    st.Page("pages/chat_interface.py", title="Chat con IA", icon="🤖"),
+]
+if profiler.enabled:
+    pages.append(st.Page("pages/profiler.py", title="Rendimiento", icon="⏱️"))
+pg = st.navigation(pages)
 
-pg.run()
+# Wall time of each page run (APP_PROFILING=1)
+with profiler.timed(pg.title, kind=PAGE):
+    pg.run()